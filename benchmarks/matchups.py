@@ -0,0 +1,55 @@
+"""Compare the scoreboard parser with the old objectpath query.
+
+Run from the repository root with ``python -m benchmarks.matchups``.
+"""
+
+import json
+import os
+import timeit
+
+import objectpath
+
+from harambot.scoreboard import parse_scoreboard
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "tests")
+NUMBER = 200
+
+
+def objectpath_teams(payload):
+    return list(
+        objectpath.Tree(payload).execute(
+            "$..scoreboard..matchups..matchup..teams"
+        )
+    )
+
+
+def main():
+    for name in ("test-matchups.json", "test-matchups-category.json"):
+        with open(os.path.join(FIXTURES, name)) as f:
+            payload = json.load(f)
+        assert len(objectpath_teams(payload)) == len(
+            parse_scoreboard(payload)[1]
+        )
+        before = min(
+            timeit.repeat(
+                lambda: objectpath_teams(payload), number=NUMBER, repeat=5
+            )
+        )
+        after = min(
+            timeit.repeat(
+                lambda: parse_scoreboard(payload), number=NUMBER, repeat=5
+            )
+        )
+        print(
+            "{}: objectpath {:.1f}us, parse_scoreboard {:.1f}us, "
+            "{:.0f}x faster".format(
+                name,
+                before / NUMBER * 1e6,
+                after / NUMBER * 1e6,
+                before / after,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Benchmarks for the Yahoo data layer, embed builders and commands.
+
+Everything runs against the JSON fixtures in ``tests/`` with Yahoo and
+Discord mocked out, caches are cleared before every run so each number is
+the full cost of the call. Results are written as JSON, pass an earlier
+result file to ``--compare`` to flag regressions::
+
+    python -m benchmarks.suite --output benchmarks/results/0.4.0.json
+    python -m benchmarks.suite --compare benchmarks/results/0.4.0.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from yahoo_fantasy_api import game, League, Team
+
+from harambot.cache import league_cache, render_cache, single_flight
+from harambot.config import settings
+from harambot.database.models import database, Guild, Player
+from harambot.yahoo_api import Yahoo
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "tests")
+RESULTS = os.path.join(os.path.dirname(__file__), "results")
+
+
+def load_fixture(filename):
+    with open(os.path.join(FIXTURES, filename)) as f:
+        return json.load(f)
+
+
+def clear_caches():
+    league_cache.clear()
+    single_flight.clear()
+    render_cache.clear()
+
+
+def make_api(scoring_type, matchups):
+    oauth = MagicMock()
+    oauth.token_is_valid.return_value = True
+    details = load_fixture("test-player-details.json")
+    roster = load_fixture("test-roster.json")["roster"]
+    with patch.object(game.Game, "game_id", return_value="319"):
+        league = League(oauth, 123456)
+    league.standings = MagicMock(
+        return_value=load_fixture("test-standings.json")["standings"]
+    )
+    league.teams = MagicMock(return_value=load_fixture("test-teams.json"))
+    league.current_week = MagicMock(return_value=1)
+    league.player_details = MagicMock(return_value=details["details"])
+    league.ownership = MagicMock(return_value=details["ownership"])
+    league.matchups = MagicMock(return_value=load_fixture(matchups))
+    team = Team(oauth, "")
+    team.roster = MagicMock(return_value=roster)
+    league.get_team = MagicMock(return_value={"Too Many Cooks": team})
+    api = Yahoo(oauth, "123456", "nfl")
+    api.scoring_type = scoring_type
+    api.league = MagicMock(return_value=league)
+    # the async getters go through the same parsing as the sync ones
+    for name in ["standings", "roster", "matchups", "player_details"]:
+        getter = getattr(api, "get_" + name)
+        setattr(
+            api,
+            "get_{}_async".format(name),
+            AsyncMock(side_effect=getter),
+        )
+    return api
+
+
+def make_cog(api):
+    # imported here so the data layer benchmarks don't need discord set up
+    from harambot.cogs.yahoo import YahooCog
+
+    cog = YahooCog(MagicMock(), "key", "secret")
+    cog.set_yahoo_from_interaction = AsyncMock(return_value=api)
+    return cog
+
+
+def make_interaction():
+    interaction = MagicMock()
+    interaction.guild_id = 1
+    interaction.response.send_message = AsyncMock()
+    return interaction
+
+
+def benchmarks():
+    head = make_api("head", "test-matchups.json")
+    category = make_api("headone", "test-matchups-category.json")
+    trade = load_fixture("test-trade.json")["trade"]
+    cog = make_cog(head)
+    category_cog = make_cog(category)
+    standings = head.get_standings()
+    roster = head.get_roster("Too Many Cooks")
+    player = head.get_player_details("Josh Allen")
+    matchups = head.get_matchups()
+    transaction = head.normalize_trade_data(trade)
+    loop = asyncio.new_event_loop()
+
+    def cold(func):
+        def run():
+            clear_caches()
+            return func()
+
+        return run
+
+    def command(command, cog=cog, *args):
+        return cold(
+            lambda: loop.run_until_complete(
+                command.callback(cog, make_interaction(), *args)
+            )
+        )
+
+    def warm_command(command, cog=cog, *args):
+        return lambda: loop.run_until_complete(
+            command.callback(cog, make_interaction(), *args)
+        )
+
+    return loop, {
+        "yahoo.get_standings": cold(head.get_standings),
+        "yahoo.get_matchups.head": cold(head.get_matchups),
+        "yahoo.get_matchups.category": cold(category.get_matchups),
+        "yahoo.get_roster": cold(lambda: head.get_roster("Too Many Cooks")),
+        "yahoo.get_player_details": cold(
+            lambda: head.get_player_details("Josh Allen")
+        ),
+        "yahoo.normalize_trade_data": lambda: head.normalize_trade_data(trade),
+        "embed.standings": lambda: cog.get_standings_embed(standings),
+        "embed.roster": lambda: cog.get_roster_embed("Too Many Cooks", roster),
+        "embed.player": lambda: cog.get_player_embed(player),
+        "embed.matchups": lambda: cog.get_matchups_embed(matchups),
+        "embed.trade": lambda: cog.create_transaction_embed(transaction, {}),
+        "command.standings": command(cog.standings),
+        "command.standings.cached": warm_command(cog.standings),
+        "command.roster": command(cog.roster, cog, "Too Many Cooks"),
+        "command.stats": command(cog.stats, cog, "Josh Allen"),
+        "command.matchups.head": command(cog.matchups),
+        "command.matchups.category": command(
+            category_cog.matchups, category_cog
+        ),
+    }
+
+
+def measure(func, number, repeat):
+    func()
+    timings = [
+        timing / number
+        for timing in timeit.repeat(func, number=number, repeat=repeat)
+    ]
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(number=100, repeat=5, only=None):
+    database.create_tables([Guild, Player])
+    # commands log on every call, that isn't what is being measured
+    logging.disable(logging.INFO)
+    loop, suite = benchmarks()
+    results = {}
+    try:
+        for name, func in suite.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(func, number, repeat)
+    finally:
+        loop.close()
+        clear_caches()
+        logging.disable(logging.NOTSET)
+    return {
+        "version": settings.get("version"),
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+        "benchmarks": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the benchmarks more than ``threshold`` slower than before."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before and result["min"] > before["min"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--number", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="*", help="only run benchmarks with these prefixes"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.number, args.repeat, args.only)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    for name, result in results["benchmarks"].items():
+        line = "{:32} {:10.1f}us".format(name, result["min"] * 1e6)
+        before = baseline and baseline["benchmarks"].get(name)
+        if before:
+            line += " {:+7.1%}".format(result["min"] / before["min"] - 1)
+        print(line)
+
+    output = args.output or os.path.join(
+        RESULTS, "{}.json".format(results["version"])
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("results written to {}".format(output))
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("regressions: {}".format(", ".join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
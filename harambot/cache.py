@@ -0,0 +1,373 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+from cachetools import LRUCache, TTLCache
+from concurrent.futures import Future
+
+from harambot.config import settings
+from harambot.database.connection import run_db
+from harambot.database.models import Guild
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL = 600
+DEFAULT_MAXSIZE = 256
+
+MISSING = object()
+
+
+def endpoint_ttl(endpoint):
+    return settings.get("cache_ttl", {}).get(endpoint, DEFAULT_TTL)
+
+
+def endpoint_grace(endpoint):
+    """How long past its TTL an entry may still be served while it is
+    refreshed in the background, capped by CACHE_MAX_STALE."""
+    grace = settings.get("cache_stale", {}).get(endpoint, 0)
+    return min(grace, settings.get("cache_max_stale", 0))
+
+
+class LeagueCache:
+    """Result cache scoped by league.
+
+    Every league gets its own TTLCache per endpoint so a busy guild can't
+    evict another guild's entries. Entries are keyed by the endpoint
+    arguments and the league week. Endpoints with a grace period keep
+    entries around that long past their TTL so they can be served stale.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or settings.get(
+            "cache_maxsize", DEFAULT_MAXSIZE
+        )
+        self.caches = {}
+        self.hits = {}
+        self.misses = {}
+        self.lock = threading.RLock()
+
+    def _cache(self, league_key, endpoint):
+        key = (str(league_key), endpoint)
+        if key not in self.caches:
+            self.caches[key] = TTLCache(
+                maxsize=self.maxsize,
+                ttl=endpoint_ttl(endpoint) + endpoint_grace(endpoint),
+            )
+        return self.caches[key]
+
+    def lookup(self, league_key, endpoint, key):
+        """Return ``(value, is_stale)``, value is MISSING on a miss."""
+        with self.lock:
+            value, stored_at = self._cache(league_key, endpoint).get(
+                key, (MISSING, None)
+            )
+            is_stale = False
+            if value is not MISSING:
+                age = time.monotonic() - stored_at
+                ttl = endpoint_ttl(endpoint)
+                if age > ttl + endpoint_grace(endpoint):
+                    value = MISSING
+                else:
+                    is_stale = age > ttl
+            counter = (
+                self.misses if value is MISSING or is_stale else self.hits
+            )
+            counter[endpoint] = counter.get(endpoint, 0) + 1
+            return value, is_stale
+
+    def get(self, league_key, endpoint, key):
+        value, is_stale = self.lookup(league_key, endpoint, key)
+        return MISSING if is_stale else value
+
+    def set(self, league_key, endpoint, key, value):
+        with self.lock:
+            self._cache(league_key, endpoint)[key] = (
+                value,
+                time.monotonic(),
+            )
+
+    def invalidate(self, league_key, endpoint=None):
+        with self.lock:
+            for cache_key in list(self.caches):
+                if cache_key[0] == str(league_key) and (
+                    endpoint is None or cache_key[1] == endpoint
+                ):
+                    del self.caches[cache_key]
+
+    def clear(self):
+        with self.lock:
+            self.caches.clear()
+            self.hits.clear()
+            self.misses.clear()
+
+
+league_cache = LeagueCache()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one.
+
+    The first caller runs the fetch, everyone who asks for the same key
+    while it is in flight waits for that result instead of making their
+    own request.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.pending_async = {}
+        self.coalesced = {}
+        self.lock = threading.Lock()
+
+    def count(self, endpoint):
+        self.coalesced[endpoint] = self.coalesced.get(endpoint, 0) + 1
+
+    def run(self, key, endpoint, func):
+        with self.lock:
+            future = self.pending.get(key)
+            leader = future is None
+            if leader:
+                future = self.pending[key] = Future()
+            else:
+                self.count(endpoint)
+        if not leader:
+            return future.result()
+        try:
+            value = func()
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.pending[key]
+
+    def start_async(self, key, endpoint, func):
+        task = self.pending_async.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.pending_async[key] = task
+            task.add_done_callback(lambda _: self.pending_async.pop(key, None))
+        else:
+            with self.lock:
+                self.count(endpoint)
+        return task
+
+    async def run_async(self, key, endpoint, func):
+        task = self.start_async(key, endpoint, func)
+        # shield so a cancelled caller doesn't cancel everyone's fetch
+        return await asyncio.shield(task)
+
+    def clear(self):
+        with self.lock:
+            self.coalesced.clear()
+
+
+single_flight = SingleFlight()
+
+
+class GuildCache:
+    """Process local cache of Guild rows.
+
+    Anything that changes a guild's row has to call ``invalidate`` so the
+    next lookup reads it again. Listeners registered with
+    ``on_invalidate`` are told too so they can drop whatever they built
+    from the old row.
+    """
+
+    def __init__(self):
+        self.guilds = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def get(self, guild_id):
+        guild_id = str(guild_id)
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = Guild.get(Guild.guild_id == guild_id)
+            with self.lock:
+                self.guilds[guild_id] = guild
+        return guild
+
+    async def get_async(self, guild_id):
+        guild = self.guilds.get(str(guild_id))
+        if guild is None:
+            guild = await run_db(self.get, guild_id)
+        return guild
+
+    def on_invalidate(self, listener):
+        self.listeners.append(listener)
+
+    def invalidate(self, guild_id):
+        guild_id = str(guild_id)
+        with self.lock:
+            self.guilds.pop(guild_id, None)
+        for listener in self.listeners:
+            listener(guild_id)
+
+    def clear(self):
+        with self.lock:
+            self.guilds.clear()
+
+
+guild_cache = GuildCache()
+
+
+class RenderCache:
+    """Rendered command output per guild, command and arguments.
+
+    Each entry remembers the data it was rendered from. The cached Yahoo
+    getters hand back the same object until the league cache refreshes
+    it (or the week rolls over), so an identity check is enough to know
+    the rendered output is still current.
+    """
+
+    def __init__(self, maxsize=None):
+        self.entries = LRUCache(
+            maxsize=maxsize
+            or settings.get("render_cache_maxsize", DEFAULT_MAXSIZE)
+        )
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, guild_id, key, data, render):
+        key = (str(guild_id), key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is data:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        rendered = render(data)
+        with self.lock:
+            self.entries[key] = (data, rendered)
+        return rendered
+
+    def invalidate(self, guild_id):
+        guild_id = str(guild_id)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == guild_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+render_cache = RenderCache()
+
+
+def cache_key(args, kwargs, week):
+    return (tuple(args), tuple(sorted(kwargs.items())), week)
+
+
+def guild_scope(api):
+    """Guild an entry of a per guild endpoint belongs to.
+
+    Falls back to the session when the Yahoo object isn't tied to a
+    guild, entries are never shared between sessions either way.
+    """
+    guild_id = getattr(api, "guild_id", None)
+    if guild_id is not None:
+        return str(guild_id)
+    return id(getattr(api, "oauth", api))
+
+
+def league_cached(endpoint, per_guild=False):
+    """Cache a Yahoo method per (league key, endpoint, args, week).
+
+    Endpoints whose result depends on whose token made the call, like
+    anything using ``is_owned_by_current_login``, pass ``per_guild`` so
+    guilds in the same league get their own entries. Failed lookups
+    (``None``) are not cached so the next call retries.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                league = self.league()
+                week = league.current_week()
+            except Exception:
+                # let the wrapped method handle and log the failure
+                return func(self, *args, **kwargs)
+            key = cache_key(args, kwargs, week)
+            if per_guild:
+                key = (guild_scope(self),) + key
+            value = league_cache.get(league.league_id, endpoint, key)
+            if value is not MISSING:
+                return value
+
+            def fetch():
+                value = func(self, *args, **kwargs)
+                if value is not None:
+                    league_cache.set(league.league_id, endpoint, key, value)
+                return value
+
+            return single_flight.run(
+                (league.league_id, endpoint, key), endpoint, fetch
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def log_refresh_error(endpoint, task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            "Error while refreshing {} in the background".format(endpoint),
+            exc_info=task.exception(),
+        )
+
+
+def league_cached_async(endpoint, per_guild=False):
+    """Coroutine version of league_cached, shares the same entries.
+
+    Expired entries still within the endpoint's grace period are returned
+    straight away while a single background task refreshes them.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                handle = await self.league_handle_async()
+            except Exception:
+                return await func(self, *args, **kwargs)
+            key = cache_key(args, kwargs, handle.current_week)
+            if per_guild:
+                key = (guild_scope(self),) + key
+            value, is_stale = league_cache.lookup(
+                handle.league_key, endpoint, key
+            )
+            if value is not MISSING and not is_stale:
+                return value
+
+            async def fetch():
+                value = await func(self, *args, **kwargs)
+                if value is not None:
+                    league_cache.set(handle.league_key, endpoint, key, value)
+                return value
+
+            flight_key = (handle.league_key, endpoint, key)
+            if value is not MISSING:
+                started = flight_key not in single_flight.pending_async
+                task = single_flight.start_async(flight_key, endpoint, fetch)
+                if started:
+                    # nobody awaits the refresh, log its failure here
+                    task.add_done_callback(
+                        functools.partial(log_refresh_error, endpoint)
+                    )
+                return value
+            return await single_flight.run_async(flight_key, endpoint, fetch)
+
+        return wrapper
+
+    return decorator
@@ -4,7 +4,7 @@ import logging
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional
-from harambot.database.models import Guild
+from harambot.cache import guild_cache
 
 logger = logging.getLogger(__file__)
 logger.setLevel(logging.INFO)
@@ -21,7 +21,7 @@ class Misc(commands.Cog):
     ):
 
         logger.info("RIP called")
-        guild = Guild.get(Guild.guild_id == str(interaction.guild_id))
+        guild = await guild_cache.get_async(interaction.guild_id)
         message = guild.RIP_text + " " + (deceased if deceased else "Harambe")
         embed = discord.Embed(title="", description="", color=0xEEE657)
         embed.set_image(url=guild.RIP_image_url)
@@ -1,6 +1,15 @@
+import discord
+import math
+
 from aiohttp import web
 from discord.ext import commands
+from harambot.cache import league_cache, single_flight
 from harambot.config import settings
+from harambot.executor import yahoo_executor
+from harambot.message_queue import message_queue
+from harambot.metrics import Collected, command_latency, registry
+from harambot.metrics import monitor_event_loop
+from harambot.tracing import tracer
 
 import logging
 
@@ -11,23 +20,186 @@ logger.setLevel(logging.INFO)
 class WebServer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.register_metrics()
+
+    def shard_stats(self):
+        """Latency and guild counts of the shards this process runs."""
+        cog = self.bot.get_cog("YahooCog")
+        polled = cog.poller.shard_guilds() if cog else {}
+        paused = cog.poller.paused if cog else set()
+        guilds = {}
+        for guild in self.bot.guilds:
+            guilds[guild.shard_id] = guilds.get(guild.shard_id, 0) + 1
+        return [
+            {
+                "shard": shard_id,
+                "latency": latency,
+                "guilds": guilds.get(shard_id, 0),
+                "polled": polled.get(shard_id, 0),
+                "paused": shard_id in paused,
+            }
+            for shard_id, latency in self.bot.latencies
+        ]
+
+    def register_metrics(self):
+        def cache_ratio():
+            for endpoint in set(league_cache.hits) | set(league_cache.misses):
+                hits = league_cache.hits.get(endpoint, 0)
+                misses = league_cache.misses.get(endpoint, 0)
+                yield {"endpoint": endpoint}, hits / (hits + misses)
+
+        def yahoo_cog():
+            return self.bot.get_cog("YahooCog")
+
+        def poller_lag():
+            cog = yahoo_cog()
+            for guild_id, lag in dict(cog.poller.lag if cog else {}).items():
+                yield {"guild": guild_id}, lag
+
+        def token_refreshes():
+            cog = yahoo_cog()
+            yield {}, cog.tokens.refresh_count if cog else 0
+
+        for metric in [
+            Collected(
+                "harambot_cache_hits_total",
+                "League cache hits per endpoint.",
+                lambda: [
+                    ({"endpoint": endpoint}, hits)
+                    for endpoint, hits in dict(league_cache.hits).items()
+                ],
+                kind="counter",
+            ),
+            Collected(
+                "harambot_cache_misses_total",
+                "League cache misses per endpoint, stale hits included.",
+                lambda: [
+                    ({"endpoint": endpoint}, misses)
+                    for endpoint, misses in dict(league_cache.misses).items()
+                ],
+                kind="counter",
+            ),
+            Collected(
+                "harambot_cache_hit_ratio",
+                "Share of league cache lookups served fresh per endpoint.",
+                lambda: list(cache_ratio()),
+            ),
+            Collected(
+                "harambot_coalesced_calls_total",
+                "Yahoo calls that joined an identical call in flight.",
+                lambda: [
+                    ({"endpoint": endpoint}, count)
+                    for endpoint, count in dict(
+                        single_flight.coalesced
+                    ).items()
+                ],
+                kind="counter",
+            ),
+            Collected(
+                "harambot_poller_lag_seconds",
+                "How late the last transaction poll of each guild started.",
+                lambda: list(poller_lag()),
+            ),
+            Collected(
+                "harambot_shard_latency_seconds",
+                "Gateway heartbeat latency per shard.",
+                lambda: [
+                    ({"shard": shard["shard"]}, shard["latency"])
+                    for shard in self.shard_stats()
+                ],
+            ),
+            Collected(
+                "harambot_shard_guilds",
+                "Guilds per shard.",
+                lambda: [
+                    ({"shard": shard["shard"]}, shard["guilds"])
+                    for shard in self.shard_stats()
+                ],
+            ),
+            Collected(
+                "harambot_token_refreshes_total",
+                "Yahoo OAuth token refreshes.",
+                lambda: list(token_refreshes()),
+                kind="counter",
+            ),
+            Collected(
+                "harambot_yahoo_executor_queued",
+                "Blocking Yahoo calls waiting for a worker.",
+                lambda: [({}, yahoo_executor.stats()["queued"])],
+            ),
+            Collected(
+                "harambot_message_queue_depth",
+                "Embeds waiting to be sent to Discord.",
+                lambda: [({}, message_queue.stats()["depth"])],
+            ),
+        ]:
+            registry.register(metric)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command
+    ):
+        command_latency.observe(
+            (discord.utils.utcnow() - interaction.created_at).total_seconds(),
+            command=command.qualified_name,
+        )
 
     async def webserver(self):
+        def format_shard(shard):
+            # latency is inf until the shard's first heartbeat
+            latency = (
+                "{}ms".format(round(shard["latency"] * 1000))
+                if math.isfinite(shard["latency"])
+                else "connecting"
+            )
+            return "Shard {}: {}, {} guilds, {} polled{}".format(
+                shard["shard"],
+                latency,
+                shard["guilds"],
+                shard["polled"],
+                " (paused)" if shard["paused"] else "",
+            )
+
         async def handler(request):
+            executor = yahoo_executor.stats()
+            messages = message_queue.stats()
+            shards = "\n            ".join(
+                format_shard(shard) for shard in self.shard_stats()
+            )
             status = f"""
             Harambot
             Harambot v{settings.version} is running!
             Bot status: {request.config_dict["bot"].status}
             Latency: {round(request.config_dict["bot"].latency * 1000)}ms
+            Yahoo workers: {executor["running"]}/{executor["workers"]} busy
+            Yahoo queue: {executor["queued"]} waiting
+            Yahoo avg wait: {round(executor["avg_wait"] * 1000)}ms
+            Yahoo max wait: {round(executor["max_wait"] * 1000)}ms
+            Coalesced Yahoo calls: {sum(single_flight.coalesced.values())}
+            Message queue: {messages["depth"]} embeds waiting
+            Message avg latency: {round(messages["avg_latency"] * 1000)}ms
+            Message max latency: {round(messages["max_latency"] * 1000)}ms
+            {shards}
             """
             return web.Response(text=status)
 
+        async def metrics(request):
+            return web.Response(
+                text=registry.render(), content_type="text/plain"
+            )
+
+        async def traces(request):
+            return web.json_response(tracer.recent())
+
         app = web.Application()
         app.router.add_get("/", handler)
+        app.router.add_get("/metrics", metrics)
+        app.router.add_get("/traces", traces)
         app["bot"] = self.bot
         runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, "0.0.0.0", settings.port)
         await self.bot.wait_until_ready()
         await site.start()
+        self.bot.loop.create_task(monitor_event_loop())
         logger.info("Webserver started on port {}".format(settings.port))
@@ -1,15 +1,27 @@
+import asyncio
 import discord
 import logging
+import time
 import urllib3
 
 from discord.ext import commands, tasks
 from discord import app_commands
-from yahoo_oauth import OAuth2
-from playhouse.shortcuts import model_to_dict
-from datetime import datetime, timedelta
-
-from harambot.yahoo_api import Yahoo
-from harambot.database.models import Guild
+from datetime import datetime
+
+from harambot.cache import guild_cache, render_cache
+from harambot.config import settings
+from harambot.yahoo_api import Yahoo, transaction_position
+from harambot.database.connection import run_db
+from harambot.database.models import Guild, PollerLease
+from harambot.executor import yahoo_executor
+from harambot.yahoo_client import yahoo_client
+from harambot.leases import PollerLeases
+from harambot.live_scoreboard import LiveScoreboards
+from harambot.message_queue import message_queue
+from harambot.poller import TransactionPoller
+from harambot.sharding import guild_shard, owns_guild
+from harambot.tokens import TokenManager
+from harambot.tracing import traced, tracer
 
 
 logger = logging.getLogger(__file__)
@@ -30,101 +42,171 @@ class YahooCog(commands.Cog):
         self.yahoo_api = None
         self.guild_id = guild_id
         self.channel_id = channel_id
+        self.poller = TransactionPoller(
+            self.poll_guild,
+            shard_of=lambda guild_id: guild_shard(self.bot, guild_id),
+        )
+        self.leases = PollerLeases()
+        self.live_scoreboards = LiveScoreboards(
+            self.fetch_live_matchups, self.get_matchups_embed
+        )
+        self.player_refresh_offsets = {}
+        self.tokens = TokenManager(KEY, SECRET)
+        self.yahoo_apis = {}
+        guild_cache.on_invalidate(
+            lambda guild_id: self.yahoo_apis.pop(guild_id, None)
+        )
+        guild_cache.on_invalidate(render_cache.invalidate)
+
+    async def cog_load(self):
+        self.sync_leases.start()
+        self.refresh_players.start()
+        self.refresh_token.start()
+
+    async def cog_unload(self):
+        self.sync_leases.cancel()
+        # polls in progress must not outlive the leases
+        await asyncio.gather(
+            *[
+                self.poller.stop_guild(guild_id)
+                for guild_id in list(self.poller.tasks)
+            ]
+        )
+        self.live_scoreboards.stop()
+        self.refresh_players.cancel()
+        self.refresh_token.cancel()
+        try:
+            await run_db(self.leases.release)
+        except Exception:
+            logger.exception("Error while releasing poller leases")
+        await yahoo_client.close()
+
+    @commands.Cog.listener()
+    async def on_shard_disconnect(self, shard_id):
+        self.poller.pause_shard(shard_id)
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        self.poller.resume_shard(shard_id)
+
+    @commands.Cog.listener()
+    async def on_shard_resumed(self, shard_id):
+        self.poller.resume_shard(shard_id)
+
+    async def yahoo_from_guild(self, guild):
+        oauth = await self.tokens.get(guild)
+        yahoo_api = self.yahoo_apis.get(guild.guild_id)
+        # the row may have been reconfigured by another worker, whose
+        # invalidation never reaches this process
+        if (
+            yahoo_api is None
+            or yahoo_api.oauth is not oauth
+            or (yahoo_api.league_id, yahoo_api.league_type)
+            != (guild.league_id, guild.league_type)
+        ):
+            yahoo_api = Yahoo(
+                oauth,
+                guild.league_id,
+                guild.league_type,
+                guild.guild_id,
+                self.tokens,
+            )
+            self.yahoo_apis[guild.guild_id] = yahoo_api
+        return yahoo_api
 
     async def cog_before_invoke(self, ctx):
-        guild = Guild.get(Guild.guild_id == str(ctx.guild.id))
-        self.yahoo_api = Yahoo(
-            OAuth2(
-                self.KEY, self.SECRET, store_file=False, **model_to_dict(guild)
-            ),
-            guild.league_id,
-            guild.league_type,
-        )
+        guild = await guild_cache.get_async(ctx.guild.id)
+        self.yahoo_api = await self.yahoo_from_guild(guild)
         return
 
     async def set_yahoo_from_interaction(
         self, interaction: discord.Interaction
     ):
-        guild = Guild.get(Guild.guild_id == str(interaction.guild_id))
-        self.yahoo_api = Yahoo(
-            OAuth2(
-                self.KEY, self.SECRET, store_file=False, **model_to_dict(guild)
-            ),
-            guild.league_id,
-            guild.league_type,
-        )
+        guild = await guild_cache.get_async(interaction.guild_id)
+        self.yahoo_api = await self.yahoo_from_guild(guild)
         logger.info(f"yahoo_api: {self.yahoo_api}")
         self.guild_id = interaction.guild_id
         self.channel_id = interaction.channel_id
-        return
+        return self.yahoo_api
     
-    async def set_yahoo_from_config(
-        self
-    ):
-        guild = Guild.get(Guild.guild_id == str(self.guild_id))
-        self.yahoo_api = Yahoo(
-            OAuth2(
-                self.KEY, self.SECRET, store_file=False, **model_to_dict(guild)
-            ),
-            guild.league_id,
-            guild.league_type
-        )
-        return
-
     @app_commands.command(
         name="standings",
         description="Returns the current standings of your league",
     )
+    @traced("YahooCog.standings")
     async def standings(self, interaction: discord.Interaction):
         logger.info("standings called")
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        standings = await yahoo_api.get_standings_async()
+        if standings is not None:
+            embed = render_cache.get(
+                interaction.guild_id,
+                ("standings",),
+                standings,
+                self.get_standings_embed,
+            )
+            await interaction.response.send_message(embed=embed)
+        else:
+            await interaction.response.send_message(self.error_message)
+
+    @traced()
+    def get_standings_embed(self, standings):
         embed = discord.Embed(
             title="Standings",
             description="Team Name\n W-L-T",
             color=0xEEE657,
         )
-        await self.set_yahoo_from_interaction(interaction)
-        for team in self.yahoo_api.get_standings():
+        for team in standings:
             embed.add_field(
                 name=team["place"],
                 value=team["record"],
                 inline=False,
             )
-        if embed:
-            await interaction.response.send_message(embed=embed)
-        else:
-            await interaction.response.send_message(self.error_message)
+        return embed
 
     @app_commands.command(
         name="roster", description="Returns the roster of the given team"
     )
+    @traced("YahooCog.roster")
     async def roster(self, interaction: discord.Interaction, team_name: str):
         logger.info("roster called")
-        await self.set_yahoo_from_interaction(interaction)
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        roster = await yahoo_api.get_roster_async(team_name)
+        if roster:
+            embed = render_cache.get(
+                interaction.guild_id,
+                ("roster", team_name),
+                roster,
+                lambda roster: self.get_roster_embed(team_name, roster),
+            )
+            await interaction.response.send_message(embed=embed)
+        else:
+            await interaction.response.send_message(self.error_message)
+
+    @traced()
+    def get_roster_embed(self, team_name, roster):
         embed = discord.Embed(
             title="{}'s Roster".format(team_name),
             description="",
             color=0xEEE657,
         )
-        roster = self.yahoo_api.get_roster(team_name)
-        if roster:
-            for player in roster:
-                embed.add_field(
-                    name=player["selected_position"],
-                    value=player["name"],
-                    inline=False,
-                )
-            await interaction.response.send_message(embed=embed)
-        else:
-            await interaction.response.send_message(self.error_message)
+        for player in roster:
+            embed.add_field(
+                name=player["selected_position"],
+                value=player["name"],
+                inline=False,
+            )
+        return embed
 
     @app_commands.command(
         name="trade",
         description="Create poll for latest trade for league approval",
     )
+    @traced("YahooCog.trade")
     async def trade(self, interaction: discord.Interaction):
         logger.info("trade called")
-        await self.set_yahoo_from_interaction(interaction)
-        latest_trade = self.yahoo_api.get_latest_trade()
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        latest_trade = await yahoo_executor.run(yahoo_api.get_latest_trade)
 
         if latest_trade is None:
             await interaction.response.send_message(
@@ -132,21 +214,45 @@ class YahooCog(commands.Cog):
             )
             return
 
-        teams = self.yahoo_api.league().teams()
+        with tracer.span("League.teams"):
+            teams = await yahoo_executor.run(
+                lambda: yahoo_api.league().teams()
+            )
 
         trader = teams[latest_trade["trader_team_key"]]
         tradee = teams[latest_trade["tradee_team_key"]]
         managers = [trader["name"], tradee["name"]]
 
+        # look up every player in the trade at once, owners for the whole
+        # trade come from a single ownership request
+        trade_players = [
+            player
+            for player in latest_trade["trader_players"]
+            + latest_trade["tradee_players"]
+            if player
+        ]
+        await yahoo_api.get_player_owners_async(
+            [player["player_id"] for player in trade_players]
+        )
+        player_details = dict(
+            zip(
+                [player["name"] for player in trade_players],
+                await asyncio.gather(
+                    *[
+                        yahoo_api.get_player_details_async(player["name"])
+                        for player in trade_players
+                    ]
+                ),
+            )
+        )
+
         player_set0 = []
         player_set0_details = ""
         for player in latest_trade["trader_players"]:
             if player:
                 player_set0.append(player["name"])
                 api_details = (
-                    self.get_player_text(
-                        self.yahoo_api.get_player_details(player["name"])
-                    )
+                    self.get_player_text(player_details[player["name"]])
                     + "\n"
                 )
                 if api_details:
@@ -160,10 +266,7 @@ class YahooCog(commands.Cog):
         for player in latest_trade["tradee_players"]:
             player_set1.append(player["name"])
             api_details = (
-                self.get_player_text(
-                    self.yahoo_api.get_player_details(player["name"])
-                )
-                + "\n"
+                self.get_player_text(player_details[player["name"]]) + "\n"
             )
             if api_details:
                 player_set1_details = player_set1_details + api_details
@@ -210,16 +313,25 @@ class YahooCog(commands.Cog):
     @app_commands.command(
         name="stats", description="Returns the details of the given player"
     )
+    @traced("YahooCog.stats")
     async def stats(self, interaction: discord.Interaction, player_name: str):
         logger.info("player_details called")
-        await self.set_yahoo_from_interaction(interaction)
-        player = self.yahoo_api.get_player_details(player_name)
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        player = await yahoo_api.get_player_details_async(
+            player_name, stats=True
+        )
         if player:
-            embed = self.get_player_embed(player)
+            embed = render_cache.get(
+                interaction.guild_id,
+                ("stats", player_name),
+                player,
+                self.get_player_embed,
+            )
             await interaction.response.send_message(embed=embed)
         else:
             await interaction.response.send_message("Player not found")
 
+    @traced()
     def get_player_embed(self, player):
         embed = discord.Embed(
             title=player["name"]["full"],
@@ -238,6 +350,7 @@ class YahooCog(commands.Cog):
         embed.set_image(url=player["image_url"])
         return embed
 
+    @traced()
     def get_player_text(self, player):
         player_details_text = (
             player["name"]["full"] + " #" + player["uniform_number"] + "\n"
@@ -269,75 +382,165 @@ class YahooCog(commands.Cog):
                 + "\n"
             )
         player_details_text = (
-            player_details_text
-            + "Owner: "
-            + self.yahoo_api.get_player_owner(player["player_id"])
+            player_details_text + "Owner: " + player["owner"]
         )
         return player_details_text
 
     @app_commands.command(
         name="matchups", description="Returns the current weeks matchups"
     )
+    @traced("YahooCog.matchups")
     async def matchups(self, interaction: discord.Interaction):
-        await self.set_yahoo_from_interaction(interaction)
-        week, details = self.yahoo_api.get_matchups()
-        if details:
-            embed = discord.Embed(
-                title="Matchups for Week {}".format(week),
-                description="",
-                color=0xEEE657,
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        matchups = await yahoo_api.get_matchups_async()
+        if matchups and matchups[1]:
+            embed = render_cache.get(
+                interaction.guild_id,
+                ("matchups",),
+                matchups,
+                self.get_matchups_embed,
             )
-            for detail in details:
-                embed.add_field(
-                    name=detail["name"], value=detail["value"], inline=False
-                )
             await interaction.response.send_message(embed=embed)
         else:
             await interaction.response.send_message(self.error_message)
 
+    @traced()
+    def get_matchups_embed(self, matchups):
+        week, details = matchups
+        embed = discord.Embed(
+            title="Matchups for Week {}".format(week),
+            description="",
+            color=0xEEE657,
+        )
+        for detail in details:
+            embed.add_field(
+                name=detail["name"], value=detail["value"], inline=False
+            )
+        return embed
+
+    async def fetch_live_matchups(self, guild_id):
+        guild = await guild_cache.get_async(guild_id)
+        yahoo_api = await self.yahoo_from_guild(guild)
+        return await yahoo_api.get_matchups_async()
+
+    @app_commands.command(
+        name="live-matchups",
+        description="Posts this weeks matchups and keeps the scores updated",
+    )
+    @traced("YahooCog.live_matchups")
+    async def live_matchups(self, interaction: discord.Interaction):
+        yahoo_api = await self.set_yahoo_from_interaction(interaction)
+        matchups = await yahoo_api.get_matchups_async()
+        if not (matchups and matchups[1]):
+            await interaction.response.send_message(self.error_message)
+            return
+        # a channel message, the interaction's token to edit its response
+        # expires after 15 minutes
+        message = await interaction.channel.send(
+            embed=self.get_matchups_embed(matchups)
+        )
+        await interaction.response.send_message(
+            "Live matchups started", ephemeral=True
+        )
+        self.live_scoreboards.add(
+            (yahoo_api.league_type, yahoo_api.league_id),
+            interaction.guild_id,
+            message,
+            matchups,
+        )
+
+    @app_commands.command(
+        name="stop-live-matchups",
+        description="Stops updating the live matchups message",
+    )
+    @traced("YahooCog.stop_live_matchups")
+    async def stop_live_matchups(self, interaction: discord.Interaction):
+        if self.live_scoreboards.is_live(interaction.guild_id):
+            self.live_scoreboards.remove(interaction.guild_id)
+            await interaction.response.send_message("done", ephemeral=True)
+        else:
+            await interaction.response.send_message(
+                "No live matchups running", ephemeral=True
+            )
+
     @app_commands.command(
     name="start-polling", description="sets the yahoo config and starts polling for waivers"
     )
+    @traced("YahooCog.start_polling")
     async def start_polling(self, interaction: discord.Interaction):
         await self.set_yahoo_from_interaction(interaction)
-        if self.poll_for_transactions.is_running():
-            await interaction.response.send_message('already running', ephemeral=True)
-        else:
-            self.poll_for_transactions.start()
+        await run_db(
+            Guild.update(
+                channel_id=str(interaction.channel_id),
+                last_transaction_check=datetime.now(),
+                last_transaction_key=None,
+            )
+            .where(Guild.guild_id == str(interaction.guild_id))
+            .execute
+        )
+        guild_cache.invalidate(interaction.guild_id)
+        # otherwise the worker holding the lease picks up the new channel
+        # when it next syncs
+        if await run_db(self.leases.claim, interaction.guild_id):
+            self.poller.add_guild(interaction.guild_id, interaction.channel_id)
 
-        if not self.refresh_token.is_running():
-            logger.info('starting refresh token')
-            self.refresh_token.start()
-        
         await interaction.response.send_message('done', ephemeral=True)
 
     @app_commands.command(
         name="waivers",
         description="Returns the wavier transactions from the last 24 hours",
     )
+    @traced("YahooCog.waivers")
     async def waivers(self, interaction: discord.Interaction):
         try:
 
-            await self.set_yahoo_from_interaction(interaction)
+            yahoo_api = await self.set_yahoo_from_interaction(interaction)
             await interaction.response.defer(thinking=True)
-            embed_functions_dict = {
-                "add/drop": self.create_add_drop_embed,
-                "add": self.create_add_embed,
-                "drop": self.create_drop_embed,
-            }
-            for transaction in self.yahoo_api.get_latest_waiver_transactions():
-                await interaction.followup.send(
-                    embed=embed_functions_dict[transaction["type"]](transaction)
-                )
+            transactions = (
+                await yahoo_api.get_latest_waiver_transactions_async()
+            )
+            headshots = await yahoo_api.get_player_headshots_async(
+                self.transaction_player_ids(transactions)
+            )
+            await message_queue.send(
+                ("interaction", interaction.id),
+                interaction.followup.send,
+                [
+                    self.create_transaction_embed(transaction, headshots)
+                    for transaction in transactions
+                ],
+            )
         except:
             logger.exception("Error while getting waivers")
 
-    def create_add_embed(self, transaction):
+    def transaction_player_ids(self, transactions):
+        """Ids of the players whose headshots the embeds will show."""
+        return [
+            transaction["players"]["0"]["player"][0][1]["player_id"]
+            for transaction in transactions
+            if transaction["type"] != "trade"
+        ]
+
+    @traced()
+    def create_transaction_embed(self, transaction, headshots):
+        if transaction["type"] == "trade":
+            return self.create_trade_embed(transaction)
+        embed_functions_dict = {
+            "add/drop": self.create_add_drop_embed,
+            "add": self.create_add_embed,
+            "drop": self.create_drop_embed,
+        }
+        return embed_functions_dict[transaction["type"]](
+            transaction, headshots
+        )
+
+    def create_add_embed(self, transaction, headshots):
         owner = transaction["players"]["0"]["player"][1]["transaction_data"][0]["destination_team_name"]
-        player_id = int(transaction["players"]["0"]["player"][0][1]["player_id"])
-        headshot= self.yahoo_api.get_player_details(player_id)["headshot"]["url"]
+        player_id = transaction["players"]["0"]["player"][0][1]["player_id"]
+        headshot = headshots.get(str(player_id))
         embed = discord.Embed(title=f"Player added by {owner}", colour=0x06B900)
-        embed.set_thumbnail(url=headshot)
+        if headshot:
+            embed.set_thumbnail(url=headshot)
         self.add_player_fields_to_embed(
             embed, transaction["players"]["0"]["player"][0]
         )
@@ -398,27 +601,29 @@ class YahooCog(commands.Cog):
 
         return embed
 
-    def create_drop_embed(self, transaction):
+    def create_drop_embed(self, transaction, headshots):
 
         owner = transaction["players"]["0"]["player"][1]["transaction_data"]["source_team_name"]
-        player_id = int(transaction["players"]["0"]["player"][0][1]["player_id"])
-        headshot= self.yahoo_api.get_player_details(player_id)["headshot"]["url"]
+        player_id = transaction["players"]["0"]["player"][0][1]["player_id"]
+        headshot = headshots.get(str(player_id))
         embed = discord.Embed(title=f"Player dropped by {owner}", colour=0xFF0000)
-        embed.set_thumbnail(url=headshot)
+        if headshot:
+            embed.set_thumbnail(url=headshot)
         self.add_player_fields_to_embed(
             embed, transaction["players"]["0"]["player"][0]
         )
         return embed
 
-    def create_add_drop_embed(self, transaction):
+    def create_add_drop_embed(self, transaction, headshots):
         owner = transaction["players"]["0"]["player"][1]["transaction_data"][
                 0
             ]["destination_team_name"]
     
-        player_id = int(transaction["players"]["0"]["player"][0][1]["player_id"])
-        headshot= self.yahoo_api.get_player_details(player_id)["headshot"]["url"]
+        player_id = transaction["players"]["0"]["player"][0][1]["player_id"]
+        headshot = headshots.get(str(player_id))
         embed = discord.Embed(title=f"Player added/dropped by {owner}", colour=0xFFFF00)
-        embed.set_thumbnail(url=headshot)
+        if headshot:
+            embed.set_thumbnail(url=headshot)
         embed.add_field(
             name="Player Added", value="=====================", inline=False
         )
@@ -445,37 +650,167 @@ class YahooCog(commands.Cog):
             name="Position", value=player[4]["display_position"], inline=inline
         )
 
-    @tasks.loop(seconds=60.0)
-    async def poll_for_transactions(self):
+    def transaction_cursor(self, guild):
+        if guild.last_transaction_check is None:
+            return None
+        return transaction_position(
+            {
+                "timestamp": guild.last_transaction_check.timestamp(),
+                "transaction_key": guild.last_transaction_key,
+            }
+        )
+
+    async def save_transaction_cursor(self, guild, transaction):
+        """Move ``guild``'s cursor on to ``transaction``.
+
+        Compare-and-set against the cursor ``guild`` was read with, and
+        only while this worker owns the guild's lease, so a poll that
+        outlived its lease can't move the cursor of the worker that took
+        over. Returns whether the cursor was saved.
+        """
+        leased = PollerLease.select(PollerLease.guild_id).where(
+            PollerLease.owner == self.leases.worker_id
+        )
+        saved = await run_db(
+            Guild.update(
+                last_transaction_check=datetime.fromtimestamp(
+                    int(transaction["timestamp"])
+                ),
+                last_transaction_key=transaction["transaction_key"],
+            )
+            .where(
+                (Guild.guild_id == guild.guild_id)
+                & (
+                    Guild.last_transaction_check
+                    == guild.last_transaction_check
+                )
+                & (
+                    Guild.last_transaction_key
+                    == guild.last_transaction_key
+                )
+                & Guild.guild_id.in_(leased)
+            )
+            .execute
+        )
+        # no guild_cache.invalidate, poll_guild reads the cursor from the
+        # database and nothing cached depends on it
+        if not saved:
+            logger.warning(
+                f"transaction cursor for guild {guild.guild_id} moved, "
+                "not saving"
+            )
+        return bool(saved)
+
+    async def poll_guild(self, guild_id, channel_id):
+        if not self.leases.holds(guild_id):
+            # the lease couldn't be renewed, another worker may have it
+            logger.warning(f"no poller lease for guild {guild_id}")
+            return
+        logger.info(f"polling for transactions in guild {guild_id}")
+        # the cursor is read from the database, not guild_cache, another
+        # worker may have moved it while it held the lease
+        guild = await run_db(
+            Guild.get_or_none, Guild.guild_id == str(guild_id)
+        )
+        if guild is None:
+            return
+        cursor = self.transaction_cursor(guild)
+        if cursor is None:
+            # first poll for this guild, only alert on what happens next
+            await self.save_transaction_cursor(
+                guild, {"timestamp": time.time(), "transaction_key": None}
+            )
+            return
+        yahoo_api = await self.yahoo_from_guild(guild)
+        channel = self.bot.get_channel(int(channel_id))
+
+        transactions = await yahoo_api.get_transactions_since_async(cursor)
+        logger.info(f"found {len(transactions)} new transactions")
+        headshots = await yahoo_api.get_player_headshots_async(
+            self.transaction_player_ids(transactions)
+        )
+        logger.debug(f"sending messages to channel: {channel_id}")
+        results = await asyncio.gather(
+            *message_queue.put(
+                ("channel", channel_id),
+                channel.send,
+                [
+                    self.create_transaction_embed(transaction, headshots)
+                    for transaction in transactions
+                ],
+            ),
+            return_exceptions=True,
+        )
+        # embeds go out in order, advance to the last one that was posted
+        # so a failure part way through only retries what wasn't
+        delivered = None
+        for transaction, result in zip(transactions, results):
+            if isinstance(result, Exception):
+                break
+            delivered = transaction
+        if delivered is not None:
+            await self.save_transaction_cursor(guild, delivered)
+
+    @tasks.loop(seconds=settings.get("poller_lease_renew_interval", 30))
+    async def sync_leases(self):
+        """Poll the guilds this worker holds leases on, and only those."""
         try:
-            logger.info('polling for transactions')
-            embed_functions_dict = {
-                "add/drop": self.create_add_drop_embed,
-                "add": self.create_add_embed,
-                "drop": self.create_drop_embed,
-                "trade": self.create_trade_embed
+            guilds = await run_db(
+                lambda: list(
+                    Guild.select().where(Guild.channel_id.is_null(False))
+                )
+            )
+            # other processes poll the guilds on their shards
+            channels = {
+                guild.guild_id: guild.channel_id
+                for guild in guilds
+                if owns_guild(self.bot, guild.guild_id)
             }
-            channel = self.bot.get_channel(self.channel_id)
-            ts = datetime.now() - timedelta(minutes=1)
-
-            transactions = self.yahoo_api.get_latest_waiver_transactions()
-            trades = self.yahoo_api.get_latest_trades()
-            transactions.extend(trades)
-            logger.info(f"found {len(transactions)} transactions")
-            for transaction in transactions:
-                logger.debug(f"transaction timestamp: {transaction['timestamp']}, time: {datetime.fromtimestamp(int(transaction['timestamp']))}")
-                if int(transaction["timestamp"]) > ts.timestamp():
-                    logger.debug(f"sending message to channel: {self.channel_id}")
-                    await channel.send(
-                        embed=embed_functions_dict[transaction["type"]](transaction)
-                    )
-        except:
-            logger.exception("Error while polling for transactions")
+            held, excess = await run_db(self.leases.sync, list(channels))
+        except Exception:
+            logger.exception("Error while syncing poller leases")
+            return
+        for guild_id in list(self.poller.tasks):
+            if guild_id not in held:
+                await self.poller.stop_guild(guild_id)
+        if excess:
+            # only once nothing is polling them any more
+            try:
+                await run_db(self.leases.release, excess)
+            except Exception:
+                logger.exception("Error while releasing poller leases")
+        for guild_id in held:
+            self.poller.add_guild(guild_id, channels[guild_id])
 
-    @tasks.loop(seconds=600.0)
+    @tasks.loop(seconds=60.0)
     async def refresh_token(self):
-        logger.info('refreshing token')
+        logger.info('refreshing tokens')
         try:
-            await self.set_yahoo_from_config()
-        except:
-            logger.exception("Error while refreshing token")
\ No newline at end of file
+            await self.tokens.refresh_expiring()
+        except Exception:
+            logger.exception("Error while refreshing tokens")
+
+    @tasks.loop(seconds=settings.get("player_refresh_interval", 300))
+    async def refresh_players(self):
+        # one guild per game is enough to read that game's player list,
+        # the process running that guild's shard does the refresh
+        guilds = {}
+        for guild in await run_db(
+            lambda: list(Guild.select().order_by(Guild.guild_id))
+        ):
+            guilds.setdefault(guild.league_type, guild)
+        pages = settings.get("player_refresh_pages", 4)
+        for game_code, guild in guilds.items():
+            if not owns_guild(self.bot, guild.guild_id):
+                continue
+            try:
+                yahoo_api = await self.yahoo_from_guild(guild)
+                self.player_refresh_offsets[
+                    game_code
+                ] = await yahoo_api.refresh_players_async(
+                    self.player_refresh_offsets.get(game_code, 0), pages
+                )
+            except Exception:
+                logger.exception(
+                    "Error while refreshing {} players".format(game_code)
+                )
@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from peewee import SqliteDatabase
+from playhouse.db_url import connect
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_STALE_TIMEOUT = 300
+
+
+def pooled_url(url):
+    """``url`` with its scheme switched to the playhouse pooled variant."""
+    scheme, separator, rest = url.partition("://")
+    if not scheme.endswith("+pool"):
+        scheme += "+pool"
+    return scheme + separator + rest
+
+
+def create_database():
+    if "DATABASE_URL" not in settings:
+        return SqliteDatabase(":memory:")
+    options = {}
+    if settings.database_url.startswith("sqlite"):
+        # pooled connections are handed between the database threads
+        options["check_same_thread"] = False
+    return connect(
+        pooled_url(settings.database_url),
+        **options,
+        max_connections=settings.get(
+            "database_max_connections", DEFAULT_MAX_CONNECTIONS
+        ),
+        # idle connections older than this are closed instead of reused
+        stale_timeout=settings.get(
+            "database_stale_timeout", DEFAULT_STALE_TIMEOUT
+        ),
+    )
+
+
+database = create_database()
+database_executor = ThreadPoolExecutor(
+    max_workers=settings.get(
+        "database_max_connections", DEFAULT_MAX_CONNECTIONS
+    ),
+    thread_name_prefix="database",
+)
+
+
+def in_memory():
+    return database.database == ":memory:"
+
+
+@contextmanager
+def connection():
+    """Hold a connection for the block and hand it back to the pool after.
+
+    An in-memory database only exists on the connection that created it,
+    so that one is left open.
+    """
+    if in_memory():
+        yield
+        return
+    with database.connection_context():
+        yield
+
+
+def call_with_connection(func, args, kwargs):
+    with connection():
+        return func(*args, **kwargs)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run blocking peewee work on the database threads.
+
+    In-memory databases are per thread, their queries run inline.
+    """
+    if in_memory():
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        database_executor,
+        functools.partial(call_with_connection, func, args, kwargs),
+    )
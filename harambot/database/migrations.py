@@ -1,14 +1,8 @@
 from playhouse.migrate import SqliteMigrator, MySQLMigrator, PostgresqlMigrator
 from playhouse.migrate import migrate
-from peewee import PostgresqlDatabase, MySQLDatabase, SqliteDatabase
-from peewee import TimestampField
-from playhouse.db_url import connect
-from harambot.config import settings
-
-if "DATABASE_URL" in settings:
-    database = connect(settings.database_url)
-else:
-    database = SqliteDatabase(":memory:")
+from peewee import PostgresqlDatabase, MySQLDatabase
+from peewee import TimestampField, TextField
+from harambot.database.connection import database
 
 # Get migrator
 migrator = None
@@ -20,6 +14,11 @@ else:
     migrator = SqliteMigrator(database)
 
 
+def missing_columns(table, columns):
+    existing = {column.name for column in database.get_columns(table)}
+    return [(name, field) for name, field in columns if name not in existing]
+
+
 # Migration Functions
 def beta003_migrations():
     last_transaction_check = TimestampField()
@@ -30,6 +29,21 @@ def beta003_migrations():
     )
 
 
+def beta040_migrations():
+    # safe to run on every start, only adds the columns that are missing
+    columns = missing_columns(
+        "guild",
+        [
+            ("channel_id", TextField(null=True)),
+            ("last_transaction_key", TextField(null=True)),
+        ],
+    )
+    migrate(
+        *[migrator.add_column("guild", name, field) for name, field in columns]
+    )
+
+
 # Migration dictionary
 migrations = {}
 migrations["0.0.3-Beta"] = beta003_migrations
+migrations["0.4.0-Beta"] = beta040_migrations
@@ -1,13 +1,6 @@
-from peewee import SqliteDatabase
 from peewee import Model
 from peewee import TextField, IntegerField, BigIntegerField, TimestampField
-from playhouse.db_url import connect
-from harambot.config import settings
-
-if "DATABASE_URL" in settings:
-    database = connect(settings.database_url)
-else:
-    database = SqliteDatabase(":memory:")
+from harambot.database.connection import database
 
 
 class BaseModel(Model):
@@ -28,3 +21,33 @@ class Guild(BaseModel):
     RIP_text = TextField()
     RIP_image_url = TextField()
     last_transaction_check = TimestampField()
+    channel_id = TextField(null=True)
+    last_transaction_key = TextField(null=True)
+
+
+class Player(BaseModel):
+    game_code = TextField()
+    player_id = TextField()
+    player_key = TextField()
+    name = TextField()
+    team_abbr = TextField(null=True)
+    display_position = TextField(null=True)
+    primary_position = TextField(null=True)
+    uniform_number = TextField(null=True)
+    headshot_url = TextField(null=True)
+    updated_at = TimestampField()
+
+    class Meta:
+        indexes = ((("game_code", "player_id"), True),)
+
+
+class PollerWorker(BaseModel):
+    worker_id = TextField(unique=True)
+    shard_group = TextField()
+    expires_at = BigIntegerField()
+
+
+class PollerLease(BaseModel):
+    guild_id = TextField(unique=True)
+    owner = TextField(null=True)
+    expires_at = BigIntegerField()
@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_WORKERS = 8
+DEFAULT_WARN_WAIT = 1.0
+
+
+class YahooExecutor:
+    """Bounded thread pool for the blocking Yahoo client.
+
+    Keeps track of how many calls are waiting for a worker and how long
+    they waited so a saturated pool shows up in the logs and on the
+    webserver status page.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.get(
+            "yahoo_executor_workers", DEFAULT_WORKERS
+        )
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="yahoo"
+        )
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _call(self, queued_at, func, args, kwargs):
+        waited = time.monotonic() - queued_at
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        warn_wait = settings.get("yahoo_executor_warn_wait", DEFAULT_WARN_WAIT)
+        if waited > warn_wait:
+            logger.warning(
+                "{} waited {:.2f}s for a Yahoo worker, {} calls queued".format(
+                    getattr(func, "__name__", func), waited, self.queued
+                )
+            )
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, func, *args, **kwargs):
+        with self.lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        # carry context variables (the current trace span) into the worker
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.pool,
+            context.run,
+            self._call,
+            time.monotonic(),
+            func,
+            args,
+            kwargs,
+        )
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "avg_wait": (
+                    self.total_wait / self.completed if self.completed else 0.0
+                ),
+                "max_wait": self.max_wait,
+            }
+
+
+yahoo_executor = YahooExecutor()
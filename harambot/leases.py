@@ -0,0 +1,191 @@
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+
+from harambot.config import settings
+from harambot.database.connection import database
+from harambot.database.models import PollerLease, PollerWorker
+from harambot.sharding import shard_group
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL = 90
+
+
+class PollerLeases:
+    """Which guilds this process polls, coordinated through the database.
+
+    Every process running the bot is a worker with a heartbeat row in
+    PollerWorker and polls the guilds whose PollerLease it owns. ``sync``
+    renews the worker's leases and evens them out: a worker holding more
+    than its share of the group's guilds stops polling the rest and
+    releases them, one holding less claims leases that are free or
+    expired, so a worker that stops renewing has its guilds picked up by
+    the others within ``ttl`` seconds. Claims are conditional updates so
+    only one worker can win a lease. Expiry uses each host's clock, they
+    should be kept in sync.
+
+    All methods block, call them through ``run_db``.
+    """
+
+    def __init__(self, worker_id=None, group=None, ttl=None):
+        self.worker_id = (
+            worker_id
+            or settings.get("poller_worker_id", None)
+            or "{}:{}:{}".format(
+                socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8]
+            )
+        )
+        self.group = group or shard_group()
+        self.ttl = ttl or settings.get("poller_lease_ttl", DEFAULT_TTL)
+        # guild id -> when our lease on it expires
+        self.held = {}
+
+    def holds(self, guild_id):
+        return time.time() < self.held.get(str(guild_id), 0)
+
+    def heartbeat(self, expires_at):
+        updated = (
+            PollerWorker.update(shard_group=self.group, expires_at=expires_at)
+            .where(PollerWorker.worker_id == self.worker_id)
+            .execute()
+        )
+        if not updated:
+            PollerWorker.create(
+                worker_id=self.worker_id,
+                shard_group=self.group,
+                expires_at=expires_at,
+            )
+        # workers that went away without releasing
+        PollerWorker.delete().where(
+            PollerWorker.expires_at < expires_at - 10 * self.ttl
+        ).execute()
+
+    def create_leases(self, guild_ids):
+        existing = {
+            lease.guild_id
+            for lease in PollerLease.select(PollerLease.guild_id).where(
+                PollerLease.guild_id.in_(guild_ids)
+            )
+        }
+        missing = [
+            {"guild_id": guild_id, "owner": None, "expires_at": 0}
+            for guild_id in guild_ids
+            if guild_id not in existing
+        ]
+        if missing:
+            PollerLease.insert_many(missing).on_conflict_ignore().execute()
+
+    def owned(self, guild_ids):
+        return [
+            lease.guild_id
+            for lease in PollerLease.select(PollerLease.guild_id)
+            .where(
+                (PollerLease.owner == self.worker_id)
+                & PollerLease.guild_id.in_(guild_ids)
+            )
+            .order_by(PollerLease.guild_id)
+        ]
+
+    def free(self, now):
+        return PollerLease.owner.is_null() | (PollerLease.expires_at < now)
+
+    def sync(self, guild_ids):
+        """Renew and claim leases on ``guild_ids``.
+
+        Returns the guild ids this worker should poll and the ones it holds
+        beyond its share. The latter should stop being polled and then be
+        given up with ``release``.
+        """
+        guild_ids = [str(guild_id) for guild_id in guild_ids]
+        now = int(time.time())
+        expires_at = now + self.ttl
+        excess = []
+        with database.atomic():
+            self.heartbeat(expires_at)
+            self.create_leases(guild_ids)
+            PollerLease.update(expires_at=expires_at).where(
+                (PollerLease.owner == self.worker_id)
+                & PollerLease.guild_id.in_(guild_ids)
+            ).execute()
+            workers = (
+                PollerWorker.select()
+                .where(
+                    (PollerWorker.shard_group == self.group)
+                    & (PollerWorker.expires_at >= now)
+                )
+                .count()
+            )
+            share = math.ceil(len(guild_ids) / max(workers, 1))
+            held = self.owned(guild_ids)
+            if len(held) > share:
+                excess = held[share:]
+            elif len(held) < share:
+                candidates = [
+                    lease.guild_id
+                    for lease in PollerLease.select(PollerLease.guild_id)
+                    .where(
+                        PollerLease.guild_id.in_(guild_ids) & self.free(now)
+                    )
+                    .order_by(PollerLease.guild_id)
+                    .limit(share - len(held))
+                ]
+                if candidates:
+                    PollerLease.update(
+                        owner=self.worker_id, expires_at=expires_at
+                    ).where(
+                        PollerLease.guild_id.in_(candidates) & self.free(now)
+                    ).execute()
+            held = [
+                guild_id
+                for guild_id in self.owned(guild_ids)
+                if guild_id not in excess
+            ]
+        self.held = {guild_id: expires_at for guild_id in held}
+        return set(held), set(excess)
+
+    def claim(self, guild_id):
+        """Take the lease on ``guild_id`` unless another worker holds it."""
+        guild_id = str(guild_id)
+        now = int(time.time())
+        expires_at = now + self.ttl
+        with database.atomic():
+            self.create_leases([guild_id])
+            claimed = (
+                PollerLease.update(owner=self.worker_id, expires_at=expires_at)
+                .where(
+                    (PollerLease.guild_id == guild_id)
+                    & (self.free(now) | (PollerLease.owner == self.worker_id))
+                )
+                .execute()
+            )
+        if claimed:
+            self.held[guild_id] = expires_at
+        return bool(claimed)
+
+    def release(self, guild_ids=None):
+        """Give up leases so other workers take over straight away.
+
+        Releases every lease and the worker's heartbeat when ``guild_ids``
+        isn't given.
+        """
+        owned = PollerLease.owner == self.worker_id
+        if guild_ids is not None:
+            guild_ids = [str(guild_id) for guild_id in guild_ids]
+            logger.info("Releasing {} guild leases".format(len(guild_ids)))
+            owned &= PollerLease.guild_id.in_(guild_ids)
+        with database.atomic():
+            PollerLease.update(owner=None, expires_at=0).where(owned).execute()
+            if guild_ids is None:
+                PollerWorker.delete().where(
+                    PollerWorker.worker_id == self.worker_id
+                ).execute()
+        if guild_ids is None:
+            self.held = {}
+        else:
+            for guild_id in guild_ids:
+                self.held.pop(guild_id, None)
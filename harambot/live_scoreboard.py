@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_INTERVAL = 60
+DEFAULT_MIN_EDIT_INTERVAL = 30
+DEFAULT_MAX_FAILURES = 3
+
+
+class LiveScoreboards:
+    """Matchup messages that are kept up to date while games are on.
+
+    Each guild has at most one board. Boards are grouped by league and
+    every league gets a single task that calls ``fetch(guild_id)`` once
+    per interval for one of its guilds, the result feeds every board of
+    that league. A board's message is only edited when the matchups
+    differ from what it shows and at most once per
+    ``live_scoreboard_min_edit_interval`` seconds, a change that comes in
+    sooner is picked up on a later tick. A board is dropped once its
+    message is gone, the bot may no longer edit it (401/403), or
+    ``live_scoreboard_max_failures`` edits in a row failed.
+    """
+
+    def __init__(self, fetch, render, interval=None, min_edit_interval=None):
+        self.fetch = fetch
+        self.render = render
+        self.interval = interval or settings.get(
+            "live_scoreboard_interval", DEFAULT_INTERVAL
+        )
+        self.min_edit_interval = (
+            min_edit_interval
+            if min_edit_interval is not None
+            else settings.get(
+                "live_scoreboard_min_edit_interval", DEFAULT_MIN_EDIT_INTERVAL
+            )
+        )
+        self.max_failures = settings.get(
+            "live_scoreboard_max_failures", DEFAULT_MAX_FAILURES
+        )
+        self.boards = {}
+        self.leagues = {}
+        self.tasks = {}
+        self.fetches = 0
+        self.edits = 0
+
+    def is_live(self, guild_id):
+        return str(guild_id) in self.leagues
+
+    def add(self, league, guild_id, message, matchups):
+        guild_id = str(guild_id)
+        self.remove(guild_id)
+        self.leagues[guild_id] = league
+        self.boards.setdefault(league, {})[guild_id] = {
+            "message": message,
+            "matchups": matchups,
+            "edited_at": time.monotonic(),
+            "failures": 0,
+        }
+        if league not in self.tasks:
+            logger.info("live scoreboard started for league {}".format(league))
+            self.tasks[league] = asyncio.create_task(self.run(league))
+
+    def remove(self, guild_id):
+        guild_id = str(guild_id)
+        league = self.leagues.pop(guild_id, None)
+        if league is None:
+            return
+        boards = self.boards[league]
+        boards.pop(guild_id, None)
+        if not boards:
+            del self.boards[league]
+            task = self.tasks.pop(league, None)
+            if task and task is not asyncio.current_task():
+                task.cancel()
+
+    def stop(self):
+        for guild_id in list(self.leagues):
+            self.remove(guild_id)
+
+    async def run(self, league):
+        while league in self.boards:
+            await asyncio.sleep(self.interval)
+            boards = self.boards.get(league)
+            if not boards:
+                break
+            try:
+                self.fetches += 1
+                matchups = await self.fetch(next(iter(boards)))
+            except Exception:
+                logger.exception(
+                    "Error while fetching matchups for league {}".format(
+                        league
+                    )
+                )
+                continue
+            if matchups:
+                await self.update(matchups, boards)
+        self.tasks.pop(league, None)
+
+    async def update(self, matchups, boards):
+        embed = None
+        for guild_id, board in list(boards.items()):
+            if matchups == board["matchups"]:
+                continue
+            if time.monotonic() - board["edited_at"] < self.min_edit_interval:
+                continue
+            if embed is None:
+                # every board of the league shows the same embed
+                embed = self.render(matchups)
+            try:
+                await board["message"].edit(embed=embed)
+            except discord.NotFound:
+                logger.info(
+                    "live scoreboard for guild {} was deleted".format(guild_id)
+                )
+                self.remove(guild_id)
+                continue
+            except discord.HTTPException as e:
+                logger.exception(
+                    "Error while updating live scoreboard for guild {}".format(
+                        guild_id
+                    )
+                )
+                board["failures"] += 1
+                if (
+                    e.status in (401, 403)
+                    or board["failures"] >= self.max_failures
+                ):
+                    logger.info(
+                        "dropping live scoreboard for guild {}".format(
+                            guild_id
+                        )
+                    )
+                    self.remove(guild_id)
+                continue
+            self.edits += 1
+            board["failures"] = 0
+            board["matchups"] = matchups
+            board["edited_at"] = time.monotonic()
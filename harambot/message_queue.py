@@ -0,0 +1,150 @@
+import asyncio
+import collections
+import logging
+import time
+
+import discord
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# discord accepts at most 10 embeds per message
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_MIN_INTERVAL = 1.0
+DEFAULT_RETRIES = 3
+
+
+class MessageQueue:
+    """Outbound embeds, batched per destination and sent in order.
+
+    Embeds queued for the same destination (a channel, an interaction
+    followup) are sent by a single worker, up to ``batch_size`` per
+    message and at least ``min_interval`` seconds apart. discord.py
+    already waits on the rate limit bucket headers, a 429 that still gets
+    through is retried after its Retry-After. When a send fails every
+    embed still queued behind it for that destination fails too, so
+    nothing is delivered out of order.
+    """
+
+    def __init__(self, batch_size=None, min_interval=None):
+        self.batch_size = batch_size or settings.get(
+            "message_queue_batch_size", DEFAULT_BATCH_SIZE
+        )
+        self.min_interval = (
+            min_interval
+            if min_interval is not None
+            else settings.get(
+                "message_queue_min_interval", DEFAULT_MIN_INTERVAL
+            )
+        )
+        self.queues = {}
+        self.workers = {}
+        self.last_sent = {}
+        self.delivered = 0
+        self.messages = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def put(self, key, send, embeds):
+        """Queue ``embeds`` for ``send(embeds=...)``.
+
+        Returns one future per embed that resolves once it was delivered.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self.queues.setdefault(key, collections.deque())
+        futures = []
+        for embed in embeds:
+            future = loop.create_future()
+            queue.append((send, embed, future, time.monotonic()))
+            futures.append(future)
+        if futures and key not in self.workers:
+            self.workers[key] = asyncio.create_task(self.drain(key))
+        return futures
+
+    async def send(self, key, send, embeds):
+        await asyncio.gather(*self.put(key, send, embeds))
+
+    async def drain(self, key):
+        queue = self.queues[key]
+        try:
+            while queue:
+                wait = self.min_interval - (
+                    time.monotonic() - self.last_sent.get(key, 0)
+                )
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                send = queue[0][0]
+                batch = []
+                while (
+                    queue
+                    and len(batch) < self.batch_size
+                    and queue[0][0] == send
+                ):
+                    batch.append(queue.popleft())
+                try:
+                    await self.deliver(send, batch)
+                except Exception as error:
+                    logger.exception(
+                        "Error while sending messages to {}".format(key)
+                    )
+                    while queue and queue[0][0] == send:
+                        batch.append(queue.popleft())
+                    self.fail(batch, error)
+                finally:
+                    self.last_sent[key] = time.monotonic()
+        finally:
+            del self.workers[key]
+            if not queue:
+                self.queues.pop(key, None)
+                self.last_sent.pop(key, None)
+
+    async def deliver(self, send, batch):
+        retries = settings.get("message_queue_retries", DEFAULT_RETRIES)
+        for attempt in range(retries + 1):
+            try:
+                await send(embeds=[embed for _, embed, _, _ in batch])
+                break
+            except discord.HTTPException as error:
+                if error.status != 429 or attempt == retries:
+                    raise
+                retry_after = float(
+                    error.response.headers.get("Retry-After", 1)
+                )
+                logger.warning(
+                    "Rate limited, retrying in {:.2f}s".format(retry_after)
+                )
+                await asyncio.sleep(retry_after)
+        now = time.monotonic()
+        self.messages += 1
+        for _, _, future, queued_at in batch:
+            latency = now - queued_at
+            self.delivered += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if not future.done():
+                future.set_result(None)
+
+    def fail(self, batch, error):
+        self.failed += len(batch)
+        for _, _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self):
+        return {
+            "depth": sum(len(queue) for queue in self.queues.values()),
+            "destinations": len(self.workers),
+            "delivered": self.delivered,
+            "messages": self.messages,
+            "failed": self.failed,
+            "avg_latency": (
+                self.total_latency / self.delivered if self.delivered else 0.0
+            ),
+            "max_latency": self.max_latency,
+        }
+
+
+message_queue = MessageQueue()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+    )
+
+
+def sample(name, labels, value):
+    return "{}{} {}".format(name, format_labels(labels), float(value))
+
+
+def header(name, documentation, kind):
+    return [
+        "# HELP {} {}".format(name, documentation),
+        "# TYPE {} {}".format(name, kind),
+    ]
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = header(self.name, self.documentation, "counter")
+        with self.lock:
+            for labels, value in self.values.items():
+                lines.append(sample(self.name, labels, value))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> [per bucket counts, sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            if key not in self.values:
+                self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts, total, count = self.values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key][1] = total + value
+            self.values[key][2] = count + 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def render(self):
+        lines = header(self.name, self.documentation, "histogram")
+        with self.lock:
+            for labels, (counts, total, count) in self.values.items():
+                for bound, bucket_count in zip(
+                    self.buckets + ("+Inf",), counts + [count]
+                ):
+                    lines.append(
+                        sample(
+                            self.name + "_bucket",
+                            labels + (("le", bound),),
+                            bucket_count,
+                        )
+                    )
+                lines.append(sample(self.name + "_sum", labels, total))
+                lines.append(sample(self.name + "_count", labels, count))
+        return lines
+
+
+class Collected:
+    """Metric whose samples are read from ``collect()`` at scrape time.
+
+    For values other parts of the bot already keep track of, ``collect``
+    returns ``(labels, value)`` pairs.
+    """
+
+    def __init__(self, name, documentation, collect, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        lines = header(self.name, self.documentation, self.kind)
+        for labels, value in self.collect():
+            lines.append(
+                sample(self.name, tuple(sorted(labels.items())), value)
+            )
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        # re-registering replaces, cogs can be reloaded
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception(
+                    "Error while collecting {}".format(metric.name)
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+command_latency = registry.register(
+    Histogram(
+        "harambot_command_seconds",
+        "Time from a slash command being invoked to its handler finishing.",
+    )
+)
+yahoo_latency = registry.register(
+    Histogram(
+        "harambot_yahoo_request_seconds",
+        "Latency of Yahoo calls per endpoint.",
+    )
+)
+yahoo_errors = registry.register(
+    Counter("harambot_yahoo_errors_total", "Failed Yahoo calls per endpoint.")
+)
+event_loop_lag = registry.register(
+    Histogram(
+        "harambot_event_loop_lag_seconds",
+        "How late the event loop ran a timer that should have fired.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+    )
+)
+
+
+async def monitor_event_loop(interval=1.0):
+    """Record how late a periodic sleep wakes up, i.e. event loop lag."""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, time.monotonic() - start - interval))
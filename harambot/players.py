@@ -0,0 +1,136 @@
+import logging
+
+from datetime import datetime
+from peewee import PeeweeException, fn
+
+from harambot.database.connection import connection, database, run_db
+from harambot.database.models import Player
+from harambot.yahoo_client import yahoo_client
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+PAGE_SIZE = 25
+
+
+def row_from_player(game_code, player):
+    """Player metadata row from a player_details style dict."""
+    return {
+        "game_code": game_code,
+        "player_id": str(player["player_id"]),
+        "player_key": player["player_key"],
+        "name": player["name"]["full"],
+        "team_abbr": player.get("editorial_team_abbr"),
+        "display_position": player.get("display_position"),
+        "primary_position": player.get("primary_position"),
+        "uniform_number": player.get("uniform_number") or None,
+        "headshot_url": player.get("headshot", {}).get("url"),
+        "updated_at": datetime.now(),
+    }
+
+
+def details_from_player(player):
+    """player_details style dict from a stored Player, without stats."""
+    return {
+        "player_id": player.player_id,
+        "player_key": player.player_key,
+        "name": {"full": player.name},
+        "editorial_team_abbr": player.team_abbr or "",
+        "display_position": player.display_position or "",
+        "primary_position": player.primary_position or "",
+        "uniform_number": player.uniform_number or "",
+        "image_url": player.headshot_url or "",
+        "headshot": {"url": player.headshot_url or ""},
+    }
+
+
+def players_from_page(page):
+    """Flatten the players of a raw ``game/{code}/players`` response."""
+    players = []
+    resource = page["fantasy_content"]["game"][1]["players"]
+    if not resource:
+        # yahoo returns an empty list past the last page
+        return players
+    for key, value in resource.items():
+        if key == "count":
+            continue
+        player = {}
+        for attribute in value["player"][0]:
+            if isinstance(attribute, dict):
+                player.update(attribute)
+        players.append(player)
+    return players
+
+
+def get_players(game_code, player_ids):
+    """Stored players of ``game_code`` keyed by player id."""
+    if not player_ids:
+        return {}
+    try:
+        with connection():
+            query = Player.select().where(
+                (Player.game_code == game_code)
+                & (Player.player_id.in_([str(p) for p in player_ids]))
+            )
+            return {player.player_id: player for player in query}
+    except PeeweeException:
+        logger.exception("Error while reading stored players")
+        return {}
+
+
+def find_player(game_code, name):
+    """Stored player of ``game_code`` called ``name``, None if unknown."""
+    try:
+        with connection():
+            return (
+                Player.select()
+                .where(
+                    (Player.game_code == game_code)
+                    & (fn.LOWER(Player.name) == name.lower())
+                )
+                .first()
+            )
+    except PeeweeException:
+        logger.exception("Error while reading stored players")
+        return None
+
+
+def save_players(game_code, players):
+    rows = [row_from_player(game_code, player) for player in players]
+    if not rows:
+        return
+    try:
+        with connection(), database.atomic():
+            Player.delete().where(
+                (Player.game_code == game_code)
+                & (Player.player_id.in_([row["player_id"] for row in rows]))
+            ).execute()
+            Player.insert_many(rows).execute()
+    except PeeweeException:
+        logger.exception("Error while storing players")
+
+
+async def refresh_players(oauth, game_code, start=0, pages=1):
+    """Refresh ``pages`` pages of the game's players starting at ``start``.
+
+    Returns where the next refresh should start, 0 once the end of the
+    player list has been reached so the next sweep starts over.
+    """
+    for _ in range(pages):
+        page = await yahoo_client.get(
+            oauth,
+            "game/{}/players;start={};count={}".format(
+                game_code, start, PAGE_SIZE
+            ),
+        )
+        players = players_from_page(page)
+        await run_db(save_players, game_code, players)
+        if len(players) < PAGE_SIZE:
+            logger.info(
+                "Finished refreshing {} {} players".format(
+                    start + len(players), game_code
+                )
+            )
+            return 0
+        start += PAGE_SIZE
+    return start
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+import zlib
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_INTERVAL = 60
+DEFAULT_CONCURRENCY = 5
+
+
+class TransactionPoller:
+    """Polls every configured guild on its own schedule.
+
+    Each guild gets a task that calls ``poll_guild(guild_id, channel_id)``
+    once per interval. Guilds are offset from each other within the
+    interval so they don't all hit Yahoo at the same moment, and a
+    semaphore caps how many polls can run at once.
+
+    Guilds are grouped by the gateway shard ``shard_of(guild_id)`` they
+    are on. Polling a shard's guilds is paused while it is disconnected,
+    nothing could be posted to their channels anyway, the next poll after
+    it resumes picks up whatever was missed.
+    """
+
+    def __init__(
+        self, poll_guild, interval=None, concurrency=None, shard_of=None
+    ):
+        self.poll_guild = poll_guild
+        self.shard_of = shard_of or (lambda guild_id: 0)
+        self.interval = interval or settings.get(
+            "poller_interval", DEFAULT_INTERVAL
+        )
+        self.semaphore = asyncio.Semaphore(
+            concurrency
+            or settings.get("poller_concurrency", DEFAULT_CONCURRENCY)
+        )
+        self.tasks = {}
+        self.channels = {}
+        self.last_poll = {}
+        self.lag = {}
+        self.shards = {}
+        self.paused = set()
+
+    def offset(self, guild_id):
+        # stable spread of guilds across the interval
+        return zlib.crc32(str(guild_id).encode()) % 1000 / 1000 * self.interval
+
+    def is_polling(self, guild_id):
+        return str(guild_id) in self.tasks
+
+    def add_guild(self, guild_id, channel_id):
+        guild_id = str(guild_id)
+        self.channels[guild_id] = channel_id
+        self.shards[guild_id] = self.shard_of(guild_id)
+        if guild_id not in self.tasks:
+            logger.info("polling transactions for guild {}".format(guild_id))
+            self.tasks[guild_id] = asyncio.create_task(self.run(guild_id))
+
+    def remove_guild(self, guild_id):
+        guild_id = str(guild_id)
+        task = self.tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+        self.channels.pop(guild_id, None)
+        self.shards.pop(guild_id, None)
+        self.last_poll.pop(guild_id, None)
+        self.lag.pop(guild_id, None)
+
+    async def stop_guild(self, guild_id):
+        """``remove_guild``, waiting until a poll in progress is cancelled."""
+        task = self.tasks.get(str(guild_id))
+        self.remove_guild(guild_id)
+        if task:
+            await asyncio.wait([task])
+
+    def pause_shard(self, shard_id):
+        if shard_id not in self.paused:
+            logger.info("pausing polling for shard {}".format(shard_id))
+            self.paused.add(shard_id)
+
+    def resume_shard(self, shard_id):
+        if shard_id in self.paused:
+            logger.info("resuming polling for shard {}".format(shard_id))
+            self.paused.discard(shard_id)
+
+    def shard_guilds(self):
+        """Number of guilds polled per shard."""
+        counts = {}
+        for shard_id in self.shards.values():
+            counts[shard_id] = counts.get(shard_id, 0) + 1
+        return counts
+
+    def stop(self):
+        for guild_id in list(self.tasks):
+            self.remove_guild(guild_id)
+
+    async def run(self, guild_id):
+        scheduled = time.monotonic() + self.offset(guild_id)
+        while True:
+            await asyncio.sleep(max(0, scheduled - time.monotonic()))
+            if self.shards[guild_id] not in self.paused:
+                await self.poll(guild_id, scheduled)
+            scheduled += self.interval
+            if scheduled < time.monotonic():
+                # skip the ticks we missed rather than bursting to catch up
+                missed = (time.monotonic() - scheduled) // self.interval + 1
+                scheduled += missed * self.interval
+
+    async def poll(self, guild_id, scheduled):
+        async with self.semaphore:
+            self.lag[guild_id] = time.monotonic() - scheduled
+            self.last_poll[guild_id] = time.time()
+            try:
+                await self.poll_guild(guild_id, self.channels[guild_id])
+            except Exception:
+                logger.exception(
+                    "Error while polling guild {}".format(guild_id)
+                )
@@ -0,0 +1,67 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class MatchupTeam(NamedTuple):
+    team_key: str
+    name: str
+    points: str
+    # head to head leagues
+    projected_points: Optional[str] = None
+    win_probability: Optional[float] = None
+    # category leagues
+    remaining_games: Optional[int] = None
+    live_games: Optional[int] = None
+    completed_games: Optional[int] = None
+
+
+class Matchup(NamedTuple):
+    week: int
+    status: str
+    teams: List[MatchupTeam]
+
+
+def indexed(resource):
+    """Values of a Yahoo ``{"0": ..., "1": ..., "count": n}`` collection."""
+    return [resource[str(i)] for i in range(int(resource["count"]))]
+
+
+def team_from_scoreboard(team):
+    info = {}
+    for attribute in team[0]:
+        if isinstance(attribute, dict):
+            info.update(attribute)
+    stats = team[1]
+    remaining = stats.get("team_remaining_games", {}).get("total", {})
+    return MatchupTeam(
+        team_key=info["team_key"],
+        name=info["name"],
+        points=stats["team_points"]["total"],
+        projected_points=stats.get("team_projected_points", {}).get("total"),
+        win_probability=stats.get("win_probability"),
+        remaining_games=remaining.get("remaining_games"),
+        live_games=remaining.get("live_games"),
+        completed_games=remaining.get("completed_games"),
+    )
+
+
+def parse_scoreboard(payload) -> Tuple[int, List[Matchup]]:
+    """Week and matchups of a raw ``league/{key}/scoreboard`` response.
+
+    Walks the known layout of the response instead of searching the whole
+    tree, works for both head to head and category scoring.
+    """
+    scoreboard = payload["fantasy_content"]["league"][1]["scoreboard"]
+    matchups = []
+    for value in indexed(scoreboard["0"]["matchups"]):
+        matchup = value["matchup"]
+        matchups.append(
+            Matchup(
+                week=int(matchup["week"]),
+                status=matchup.get("status"),
+                teams=[
+                    team_from_scoreboard(team["team"])
+                    for team in indexed(matchup["0"]["teams"])
+                ],
+            )
+        )
+    return int(scoreboard["week"]), matchups
@@ -0,0 +1,66 @@
+import logging
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+
+def shard_id(guild_id, shard_count):
+    """Gateway shard that receives ``guild_id``'s events.
+
+    Same formula discord uses, see ``discord.Guild.shard_id``.
+    """
+    return (int(guild_id) >> 22) % (shard_count or 1)
+
+
+def shard_options():
+    """AutoShardedBot arguments from SHARD_COUNT and SHARD_IDS.
+
+    A SHARD_COUNT of 0 lets discord recommend one. SHARD_IDS restricts
+    this process to some of the shards so they can be split across
+    processes, every process needs the same SHARD_COUNT then.
+    """
+    shard_count = settings.get("shard_count", 0) or None
+    shard_ids = list(settings.get("shard_ids", [])) or None
+    if shard_ids is not None and shard_count is None:
+        raise ValueError("SHARD_IDS needs SHARD_COUNT to be set")
+    logger.info(
+        "Starting shards {} of {}".format(
+            shard_ids or "all", shard_count or "recommended"
+        )
+    )
+    return {"shard_count": shard_count, "shard_ids": shard_ids}
+
+
+def bot_shard_count(bot):
+    shard_count = getattr(bot, "shard_count", None)
+    # None until the bot has connected, or not a sharded bot at all
+    return shard_count if isinstance(shard_count, int) else 1
+
+
+def guild_shard(bot, guild_id):
+    return shard_id(guild_id, bot_shard_count(bot))
+
+
+def owns_guild(bot, guild_id):
+    """Whether ``guild_id`` is on one of the shards this process runs."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    if not isinstance(shard_ids, (list, tuple)):
+        return True
+    return guild_shard(bot, guild_id) in shard_ids
+
+
+def shard_group():
+    """Name of the shards this process runs, e.g. ``0,1/4``.
+
+    Processes with the same group handle the same guilds and share out
+    their polling.
+    """
+    shard_ids = list(settings.get("shard_ids", []))
+    if not shard_ids:
+        return "all"
+    return "{}/{}".format(
+        ",".join(str(shard_id) for shard_id in sorted(shard_ids)),
+        settings.get("shard_count", 0),
+    )
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+from yahoo_oauth import OAuth2
+from playhouse.shortcuts import model_to_dict
+
+from harambot.cache import guild_cache
+from harambot.config import settings
+from harambot.database.connection import run_db
+from harambot.database.models import Guild
+from harambot.executor import yahoo_executor
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# yahoo_oauth treats a token as expired 3540s after it was issued
+TOKEN_LIFETIME = 3540
+DEFAULT_REFRESH_MARGIN = 600
+
+
+class TokenManager:
+    """One Yahoo OAuth session per guild, refreshed before it expires.
+
+    Sessions are loaded once and reused by every command and poll for the
+    guild. ``refresh_expiring`` is meant to run in the background so
+    tokens are renewed ahead of time; concurrent refreshes for the same
+    guild share a single request and new tokens are written back to the
+    Guild row.
+    """
+
+    def __init__(self, key, secret):
+        self.key = key
+        self.secret = secret
+        self.sessions = {}
+        self.pending = {}
+        self.refresh_count = 0
+        self.loop = None
+
+    def create_session(self, guild):
+        # OAuth2 refreshes an expired token while it is being built
+        return OAuth2(
+            self.key, self.secret, store_file=False, **model_to_dict(guild)
+        )
+
+    def expires_soon(self, oauth):
+        margin = settings.get("token_refresh_margin", DEFAULT_REFRESH_MARGIN)
+        return time.time() - oauth.token_time > TOKEN_LIFETIME - margin
+
+    def save(self, guild_id, oauth):
+        Guild.update(
+            access_token=oauth.access_token,
+            refresh_token=oauth.refresh_token,
+            token_type=oauth.token_type,
+            token_time=int(oauth.token_time),
+        ).where(Guild.guild_id == guild_id).execute()
+        guild_cache.invalidate(guild_id)
+
+    async def single_flight(self, guild_id, func, *args):
+        task = self.pending.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(func(guild_id, *args))
+            self.pending[guild_id] = task
+            task.add_done_callback(lambda _: self.pending.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def load(self, guild_id, guild):
+        oauth = await yahoo_executor.run(self.create_session, guild)
+        if int(oauth.token_time) != int(guild.token_time):
+            self.refresh_count += 1
+            await run_db(self.save, guild_id, oauth)
+        self.sessions[guild_id] = oauth
+        return oauth
+
+    async def refresh_session(self, guild_id):
+        oauth = self.sessions[guild_id]
+        logger.info("refreshing token for guild {}".format(guild_id))
+        await yahoo_executor.run(oauth.refresh_access_token)
+        # the requests session keeps the token it was created with
+        oauth.session = oauth.oauth.get_session(token=oauth.access_token)
+        self.refresh_count += 1
+        await run_db(self.save, guild_id, oauth)
+        return oauth
+
+    async def get(self, guild):
+        self.loop = asyncio.get_running_loop()
+        guild_id = str(guild.guild_id)
+        if guild_id not in self.sessions:
+            return await self.single_flight(guild_id, self.load, guild)
+        oauth = self.sessions[guild_id]
+        if not oauth.token_is_valid():
+            # the background refresh didn't get to it in time
+            return await self.single_flight(guild_id, self.refresh_session)
+        return oauth
+
+    async def refresh(self, guild_id):
+        return await self.single_flight(str(guild_id), self.refresh_session)
+
+    def refresh_threadsafe(self, guild_id):
+        """``refresh`` for code running on an executor thread.
+
+        Blocks until the refresh scheduled on the bot's loop is done.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self.loop is None or running is self.loop:
+            raise RuntimeError("refresh_threadsafe needs an executor thread")
+        return asyncio.run_coroutine_threadsafe(
+            self.refresh(guild_id), self.loop
+        ).result()
+
+    async def refresh_expiring(self):
+        guild_ids = [
+            guild_id
+            for guild_id, oauth in self.sessions.items()
+            if self.expires_soon(oauth)
+        ]
+        results = await asyncio.gather(
+            *[self.refresh(guild_id) for guild_id in guild_ids],
+            return_exceptions=True,
+        )
+        for guild_id, result in zip(guild_ids, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Error while refreshing token for guild {}: {}".format(
+                        guild_id, result
+                    )
+                )
+
+    def forget(self, guild_id):
+        self.sessions.pop(str(guild_id), None)
@@ -0,0 +1,147 @@
+import asyncio
+import collections
+import contextvars
+import functools
+import inspect
+import logging
+import random
+import time
+
+from contextlib import contextmanager
+
+from harambot.config import settings
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_KEEP = 50
+DEFAULT_SLOW = 2.0
+
+# set for the rest of a trace that wasn't sampled so its spans are skipped
+NOT_SAMPLED = object()
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.monotonic()
+        self.duration = None
+        self.children = []
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def format(self, depth=0):
+        lines = [
+            "{}{} {:.1f}ms".format(
+                "  " * depth, self.name, (self.duration or 0) * 1000
+            )
+        ]
+        for child in self.children:
+            lines.extend(child.format(depth + 1))
+        return lines
+
+
+class Tracer:
+    """Nested timing spans for commands and Yahoo calls.
+
+    Off unless TRACING_ENABLED is set, traced functions then call straight
+    through. When on, a TRACING_SAMPLE_RATE share of the outermost spans
+    start a trace, the last TRACING_KEEP traces are kept for the
+    webserver and traces slower than TRACING_SLOW seconds are logged.
+    """
+
+    def __init__(self):
+        self.enabled = settings.get("tracing_enabled", False)
+        self.sample_rate = settings.get(
+            "tracing_sample_rate", DEFAULT_SAMPLE_RATE
+        )
+        self.slow = settings.get("tracing_slow", DEFAULT_SLOW)
+        self.traces = collections.deque(
+            maxlen=settings.get("tracing_keep", DEFAULT_KEEP)
+        )
+
+    @contextmanager
+    def span(self, name):
+        parent = current_span.get()
+        if parent is NOT_SAMPLED or not self.enabled:
+            yield None
+            return
+        if parent is None and random.random() >= self.sample_rate:
+            token = current_span.set(NOT_SAMPLED)
+            try:
+                yield None
+            finally:
+                current_span.reset(token)
+            return
+        span = Span(name)
+        if parent is not None:
+            parent.children.append(span)
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.monotonic() - span.start
+            current_span.reset(token)
+            if parent is None:
+                self.finish(span)
+
+    def finish(self, span):
+        self.traces.append(span)
+        if span.duration >= self.slow:
+            logger.info("slow trace\n{}".format("\n".join(span.format())))
+
+    def recent(self):
+        return [span.to_dict() for span in list(self.traces)]
+
+
+tracer = Tracer()
+
+
+def traced(name=None):
+    """Run the decorated function or coroutine in a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return func(*args, **kwargs)
+                with tracer.span(span_name):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(cls):
+    """Class decorator tracing every public method of ``cls``."""
+    for attribute, value in list(vars(cls).items()):
+        if inspect.isfunction(value) and not attribute.startswith("_"):
+            setattr(
+                cls,
+                attribute,
+                traced("{}.{}".format(cls.__name__, attribute))(value),
+            )
+    return cls
@@ -3,6 +3,8 @@ import logging
 
 from discord.utils import MISSING
 from typing import Optional
+from harambot.cache import guild_cache
+from harambot.database.connection import run_db
 from harambot.database.models import Guild
 from harambot.utils import yahoo_auth
 
@@ -42,12 +44,13 @@ class ConfigModal(discord.ui.Modal, title="Configure Guild"):
         title: str = MISSING,
         timeout: Optional[float] = None,
         custom_id: str = MISSING,
-        guild_id: str = None,
+        guild: Guild = None,
         view: discord.ui.View = None,
     ) -> None:
         super().__init__(title=title, timeout=timeout, custom_id=custom_id)
         self.view = view
-        self.guild = Guild.get_or_none(Guild.guild_id == str(guild_id))
+        # loaded by the caller, see ConfigGuildButton.callback
+        self.guild = guild
         if self.guild:
             self.remove_item(self.yahoo_token)
             self.league_id.default = self.guild.league_id
@@ -63,13 +66,16 @@ class ConfigModal(discord.ui.Modal, title="Configure Guild"):
             "RIP_image_url": self.RIP_image_url.value,
         }
         if self.guild:
-            Guild.update(details).where(
-                Guild.guild_id == self.guild.guild_id
-            ).execute()
+            await run_db(
+                Guild.update(details)
+                .where(Guild.guild_id == self.guild.guild_id)
+                .execute
+            )
         else:
             details.update(yahoo_auth(self.yahoo_token.value))
             self.guild = Guild(guild_id=str(interaction.guild_id), **details)
-            self.guild.save()
+            await run_db(self.guild.save)
+        guild_cache.invalidate(interaction.guild_id)
         await interaction.response.send_message(
             "Guild settings updated!",
             ephemeral=True,
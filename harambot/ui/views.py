@@ -1,6 +1,8 @@
 import discord
 
 from harambot.config import settings
+from harambot.database.connection import run_db
+from harambot.database.models import Guild
 from harambot.utils import YAHOO_API_URL, YAHOO_AUTH_URI
 from harambot.ui.modals import ConfigModal
 
@@ -25,10 +27,11 @@ class ConfigGuildButton(discord.ui.Button):
         self.parent_view = parent_view
 
     async def callback(self, interaction: discord.Interaction):
+        guild = await run_db(
+            Guild.get_or_none, Guild.guild_id == str(interaction.guild_id)
+        )
         await interaction.response.send_modal(
-            ConfigModal(
-                guild_id=str(interaction.guild_id), view=self.parent_view
-            )
+            ConfigModal(guild=guild, view=self.parent_view)
         )
 
 
@@ -1,252 +1,741 @@
-import logging
-import os
-import objectpath
-
-
-from yahoo_fantasy_api import game
-from cachetools import cached, TTLCache
-from datetime import datetime, timedelta
-
-
-logger = logging.getLogger(__file__)
-logger.setLevel(logging.INFO)
-logging.disable(logging.DEBUG)
-
-
-dir_path = os.path.dirname(os.path.realpath(__file__))
-
-
-class Yahoo:
-
-    oauth = None
-    scoring_type = None
-
-    def __init__(self, oauth, league_id, league_type):
-        self.oauth = oauth
-        self.league_id = league_id
-        self.league_type = league_type
-
-    def league(self):
-        is_valid = self.oauth.token_is_valid()
-        logger.info("Token is valid: {}".format(is_valid))
-        if not is_valid:
-            self.oauth.refresh_access_token()
-        gm = game.Game(self.oauth, self.league_type)
-        league = gm.to_league("{}.l.{}".format(gm.game_id(), self.league_id))
-        self.scoring_type = league.settings()["scoring_type"]
-        return league
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_standings(self):
-        try:
-            standings = []
-            for idx, team in enumerate(self.league().standings()):
-                outcomes = team["outcome_totals"]
-                record = "{}-{}-{}".format(
-                    outcomes["wins"], outcomes["losses"], outcomes["ties"]
-                )
-                standings.append(
-                    {
-                        "place": str(idx + 1) + ". " + team["name"],
-                        "record": record,
-                    }
-                )
-            return standings
-        except Exception:
-            logger.exception(
-                "Error while fetching standings for league {}".format(
-                    self.league_id
-                )
-            )
-            return None
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_roster(self, team_name):
-        team_details = self.league().get_team(team_name)
-        if team_details:
-            return team_details[team_name].roster(self.league().current_week())
-        else:
-            return None
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_player_details(self, player_name):
-        try:
-            player = self.league().player_details(player_name)[0]
-            player["owner"] = self.get_player_owner(player["player_id"])
-            return player
-        except Exception:
-            logger.exception(
-                "Error while fetching player details for player: \
-                    {} in league {}".format(
-                    player_name, self.league_id
-                )
-            )
-            return None
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_player_owner(self, player_id):
-        try:
-            player_ownership = self.league().ownership([player_id])[
-                str(player_id)
-            ]
-            if "owner_team_name" in player_ownership:
-                return player_ownership["owner_team_name"]
-            else:
-                ownership_map = {
-                    "freeagents": "Free Agent",
-                    "waivers": "On Waviers",
-                }
-                return ownership_map.get(
-                    player_ownership["ownership_type"], ""
-                )
-        except Exception:
-            logger.exception(
-                "Error while fetching ownership for player id: \
-                    {} in league {}".format(
-                    player_id, self.league_id
-                )
-            )
-            return None
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_matchups(self):
-        try:
-            matchups = objectpath.Tree(self.league().matchups()).execute(
-                "$..scoreboard..matchups..matchup..teams"
-            )
-
-            details = []
-            divider = "--------------------------------------"
-            for matchup in matchups:
-                team1_details = self.get_matchup_details(matchup["0"]["team"])
-                team2_details = self.get_matchup_details(matchup["1"]["team"])
-                details.append(
-                    {
-                        "name": "{} vs {}".format(
-                            team1_details["name"], team2_details["name"]
-                        ),
-                        "value": team1_details["text"]
-                        + team2_details["text"]
-                        + divider,
-                    }
-                )
-            return str(self.league().current_week()), details
-        except Exception:
-            logger.exception(
-                "Error while fetching matchups for league: {}".format(
-                    self.league_id
-                )
-            )
-
-    def get_matchup_details(self, team):
-        team_name = team[0][2]["name"]
-        team_details = ""
-        if self.scoring_type == "head":
-            # handle data for head to head scoring
-            team1_actual_points = team[1]["team_points"]["total"]
-            team1_projected_points = team[1]["team_projected_points"]["total"]
-            if "win_probability" in team[1]:
-                team1_win_probability = "{:.0%}".format(
-                    team[1]["win_probability"]
-                )
-                team_details = "***{}*** \n Projected Score: {} \n  \
-                            Actual Score: {} \n Win Probability: {} \n".format(
-                    team_name,
-                    team1_projected_points,
-                    team1_actual_points,
-                    team1_win_probability,
-                )
-            else:
-                team_details = "***{}*** \n Projected Score: {} \n  \
-                            Actual Score: {} \n".format(
-                    team_name,
-                    team1_projected_points,
-                    team1_actual_points,
-                )
-        else:
-            team_details = "***{}*** \n Score: {} \n  \
-                            Remaining Games: {} \n \
-                                Live Games: {} \n \
-                                    Completed Games: {} \n".format(
-                team_name,
-                team[1]["team_points"]["total"],
-                team[1]["team_remaining_games"]["total"]["remaining_games"],
-                team[1]["team_remaining_games"]["total"]["live_games"],
-                team[1]["team_remaining_games"]["total"]["completed_games"],
-            )
-        return {"name": team_name, "text": team_details}
-
-    @cached(cache=TTLCache(maxsize=1024, ttl=600))
-    def get_latest_trade(self):
-        try:
-            for key, values in self.league().teams().items():
-                if "is_owned_by_current_login" in values:
-                    team = self.league().to_team(key)
-                    accepted_trades = list(
-                        filter(
-                            lambda d: d["status"] == "accepted",
-                            team.proposed_trades(),
-                        )
-                    )
-                    if accepted_trades:
-                        return accepted_trades[0]
-            return
-        except Exception:
-            logger.exception("Error while fetching latest trade")
-
-    def normalize_trade_data(self, trade_data):
-        normalized_data = {
-            "transaction_key": trade_data["transaction_key"],
-            "transaction_id": trade_data["transaction_id"],
-            "type": trade_data["type"],
-            "status": trade_data["status"],
-            "timestamp": trade_data["timestamp"],
-            "trader_team_key": trade_data["trader_team_key"],
-            "trader_team_name": trade_data["trader_team_name"],
-            "tradee_team_key": trade_data["tradee_team_key"],
-            "tradee_team_name": trade_data["tradee_team_name"],
-            "player_count": trade_data["players"].get("count", 0),
-            "players": [],
-        }
-
-        for i in range(normalized_data["player_count"]):
-            player_info = trade_data["players"][str(i)]
-
-            player_data = player_info.get("player", [])[0]
-
-            transaction_data = player_info.get("player", [])[1]["transaction_data"]
-
-            player = {
-                "player_key": player_data[0]["player_key"],
-                "player_id": player_data[1]["player_id"],
-                "name": player_data[2]["name"]["full"],
-                "team_abbr": player_data[3]["editorial_team_abbr"],
-                "display_position": player_data[4]["display_position"],
-                "position_type": player_data[5]["position_type"],
-                "source_team_name": transaction_data[0].get("source_team_name", ""),
-                "destination_team_name": transaction_data[0].get("destination_team_name", ""),
-            }
-
-            normalized_data["players"].append(player)
-
-        return normalized_data
-
-    def get_latest_trades(self):
-        ts = datetime.now() - timedelta(hours=1)
-        transactions = self.league().transactions("trade", "")
-        filtered_transactions = [
-            t for t in transactions if int(t["timestamp"]) > ts.timestamp() and t["status"] == "successful"
-        ]
-        logger.info(f'found {len(transactions)} trades')
-        trades = []
-        for transaction in filtered_transactions:
-            trades.append(self.normalize_trade_data(transaction))
-        return trades
-
-    def get_latest_waiver_transactions(self):
-        ts = datetime.now() - timedelta(days=1)
-        transactions = self.league().transactions("add,drop", "")
-        filtered_transactions = [
-            t for t in transactions if int(t["timestamp"]) > ts.timestamp()
-        ]
-        return filtered_transactions
+import logging
+import os
+import threading
+import time
+
+
+from yahoo_fantasy_api import game, League
+from datetime import datetime, timedelta
+
+from harambot.cache import MISSING, cache_key, league_cache
+from harambot.cache import league_cached, league_cached_async
+from harambot.config import settings
+from harambot.database.connection import run_db
+from harambot.executor import yahoo_executor
+from harambot.players import details_from_player, find_player, get_players
+from harambot.players import refresh_players, save_players
+from harambot.scoreboard import parse_scoreboard
+from harambot.tracing import tracer, traced_methods
+from harambot.yahoo_client import TimedHandler, yahoo_client
+
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+logging.disable(logging.DEBUG)
+
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+
+class LeagueHandle:
+    """What we know about a single Yahoo league.
+
+    The game id, league key, scoring type and current week are resolved
+    once and only re-checked every ``league_refresh_interval`` seconds.
+    Every call builds its own cheap League on top of them with the
+    caller's session, guilds in the same league never share one, that
+    would send one guild's requests with another guild's token.
+    """
+
+    def __init__(self, league_type, league_id):
+        self.league_type = league_type
+        self.league_id = league_id
+        self.game_id = None
+        self.league_key = None
+        self.scoring_type = None
+        self.season = None
+        self.current_week = None
+        self.settings = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def is_stale(self):
+        interval = settings.get("league_refresh_interval", 3600)
+        return (
+            self.league_key is None
+            or time.time() - self.checked_at > interval
+        )
+
+    def refresh(self, oauth, handler=None):
+        gm = game.Game(oauth, self.league_type)
+        gm.inject_yhandler(handler or TimedHandler(oauth))
+        game_id = gm.game_id()
+        league_key = "{}.l.{}".format(game_id, self.league_id)
+        league = gm.to_league(league_key)
+        league_settings = league.settings()
+        season = league_settings.get("season")
+        current_week = league_settings.get("current_week")
+        if current_week is not None:
+            # settings already carries the current week, prime the league
+            # cache so current_week() doesn't fetch the scoreboard again
+            current_week = int(current_week)
+            league.current_week_cache = current_week
+        with self.lock:
+            if (
+                league_key != self.league_key
+                or season != self.season
+                or current_week != self.current_week
+            ):
+                logger.info(
+                    "Refreshing league handle for {}".format(league_key)
+                )
+                self.game_id = game_id
+                self.league_key = league_key
+                self.season = season
+                self.current_week = current_week
+            self.settings = league_settings
+            self.scoring_type = league_settings["scoring_type"]
+            self.checked_at = time.time()
+
+    def to_league(self, oauth, handler):
+        """Build a throwaway League for ``oauth`` on top of ``handler``."""
+        lg = League(oauth, self.league_key)
+        lg.inject_yhandler(handler)
+        lg.settings_cache = self.settings
+        lg.current_week_cache = self.current_week
+        return lg
+
+
+league_handles = {}
+league_handles_lock = threading.Lock()
+
+
+def transaction_position(transaction):
+    """Sort key for transactions: (timestamp, transaction id)."""
+    key = transaction.get("transaction_key") or ""
+    transaction_id = key.rsplit(".", 1)[-1]
+    return (
+        int(transaction["timestamp"]),
+        int(transaction_id) if transaction_id.isdigit() else 0,
+    )
+
+
+def get_league_handle(league_type, league_id):
+    key = (league_type, str(league_id))
+    with league_handles_lock:
+        if key not in league_handles:
+            league_handles[key] = LeagueHandle(league_type, league_id)
+        return league_handles[key]
+
+
+@traced_methods
+class Yahoo:
+
+    oauth = None
+    scoring_type = None
+
+    def __init__(
+        self, oauth, league_id, league_type, guild_id=None, tokens=None
+    ):
+        self.oauth = oauth
+        self.league_id = league_id
+        self.league_type = league_type
+        self.guild_id = guild_id
+        # TokenManager the session came from, refreshes go through it
+        self.tokens = tokens
+
+    def league(self):
+        is_valid = self.oauth.token_is_valid()
+        logger.info("Token is valid: {}".format(is_valid))
+        if not is_valid:
+            if self.tokens is not None:
+                self.oauth = self.tokens.refresh_threadsafe(self.guild_id)
+            else:
+                self.oauth.refresh_access_token()
+        handle = get_league_handle(self.league_type, self.league_id)
+        if handle.is_stale():
+            handle.refresh(self.oauth)
+        self.scoring_type = handle.scoring_type
+        return handle.to_league(self.oauth, TimedHandler(self.oauth))
+
+    async def check_token_async(self):
+        if not self.oauth.token_is_valid():
+            await self.refresh_session()
+
+    async def refresh_session(self):
+        if self.tokens is not None:
+            self.oauth = await self.tokens.refresh(self.guild_id)
+        else:
+            await yahoo_executor.run(self.oauth.refresh_access_token)
+        return self.oauth
+
+    async def league_handle_async(self):
+        await self.check_token_async()
+        handle = get_league_handle(self.league_type, self.league_id)
+        if handle.is_stale():
+            await yahoo_client.call(
+                self.oauth,
+                lambda h: handle.refresh(self.oauth, h),
+                refresh=self.refresh_session,
+            )
+        self.scoring_type = handle.scoring_type
+        return handle
+
+    async def fetch(self, func):
+        """Await ``func(league)`` with every request made through aiohttp."""
+        return (await self.fetch_all(func))[0]
+
+    async def fetch_all(self, *funcs):
+        """Await each ``func(league)``, fetching their requests together."""
+        handle = await self.league_handle_async()
+        return await yahoo_client.call_all(
+            self.oauth,
+            [
+                lambda h, func=func: func(handle.to_league(self.oauth, h))
+                for func in funcs
+            ],
+            refresh=self.refresh_session,
+        )
+
+    def standings_from_league(self, league):
+        standings = []
+        for idx, team in enumerate(league.standings()):
+            outcomes = team["outcome_totals"]
+            record = "{}-{}-{}".format(
+                outcomes["wins"], outcomes["losses"], outcomes["ties"]
+            )
+            standings.append(
+                {
+                    "place": str(idx + 1) + ". " + team["name"],
+                    "record": record,
+                }
+            )
+        return standings
+
+    @league_cached("standings")
+    def get_standings(self):
+        try:
+            return self.standings_from_league(self.league())
+        except Exception:
+            logger.exception(
+                "Error while fetching standings for league {}".format(
+                    self.league_id
+                )
+            )
+            return None
+
+    @league_cached_async("standings")
+    async def get_standings_async(self):
+        try:
+            return await self.fetch(self.standings_from_league)
+        except Exception:
+            logger.exception(
+                "Error while fetching standings for league {}".format(
+                    self.league_id
+                )
+            )
+            return None
+
+    def roster_from_league(self, league, team_name):
+        team_details = league.get_team(team_name)
+        if team_details:
+            return team_details[team_name].roster(league.current_week())
+        else:
+            return None
+
+    @league_cached("roster")
+    def get_roster(self, team_name):
+        return self.roster_from_league(self.league(), team_name)
+
+    @league_cached_async("roster")
+    async def get_roster_async(self, team_name):
+        try:
+            return await self.fetch(
+                lambda league: self.roster_from_league(league, team_name)
+            )
+        except Exception:
+            logger.exception(
+                "Error while fetching roster {} for league {}".format(
+                    team_name, self.league_id
+                )
+            )
+            return None
+
+    def stored_player_details(self, player_name):
+        player = find_player(self.league_type, player_name)
+        return details_from_player(player) if player else None
+
+    @league_cached("player_details")
+    def lookup_player_details(self, player_name, stats=False):
+        """Details of ``player_name`` without its owner.
+
+        Players in the player store are read from it, Yahoo is only asked
+        for players it doesn't know yet or when ``stats`` (bye week and
+        points) are wanted. Owners change more often than details, they
+        are cached separately under ``player_owner``.
+        """
+        try:
+            player = None if stats else self.stored_player_details(player_name)
+            if player is None:
+                player = self.league().player_details(player_name)[0]
+                save_players(self.league_type, [player])
+            return player
+        except Exception:
+            logger.exception(
+                "Error while fetching player details for player: \
+                    {} in league {}".format(
+                    player_name, self.league_id
+                )
+            )
+            return None
+
+    @league_cached_async("player_details")
+    async def lookup_player_details_async(self, player_name, stats=False):
+        try:
+            player = (
+                None
+                if stats
+                else await run_db(self.stored_player_details, player_name)
+            )
+            if player is None:
+                player = (
+                    await self.fetch(
+                        lambda league: league.player_details(player_name)
+                    )
+                )[0]
+                await run_db(save_players, self.league_type, [player])
+            return player
+        except Exception:
+            logger.exception(
+                "Error while fetching player details for player: \
+                    {} in league {}".format(
+                    player_name, self.league_id
+                )
+            )
+            return None
+
+    def get_player_details(self, player_name, stats=False):
+        """Details of ``player_name`` with its current owner."""
+        player = self.lookup_player_details(player_name, stats)
+        if player is None:
+            return None
+        # a copy, the cached details are shared
+        return dict(
+            player, owner=self.get_player_owner(player["player_id"])
+        )
+
+    async def get_player_details_async(self, player_name, stats=False):
+        player = await self.lookup_player_details_async(player_name, stats)
+        if player is None:
+            return None
+        return dict(
+            player,
+            owner=await self.get_player_owner_async(player["player_id"]),
+        )
+
+    def owner_from_ownership(self, player_ownership):
+        if "owner_team_name" in player_ownership:
+            return player_ownership["owner_team_name"]
+        else:
+            ownership_map = {
+                "freeagents": "Free Agent",
+                "waivers": "On Waviers",
+            }
+            return ownership_map.get(player_ownership["ownership_type"], "")
+
+    def cached_player_values(self, league_key, endpoint, week, player_ids):
+        values = {}
+        missing = []
+        for player_id in player_ids:
+            value = league_cache.get(
+                league_key, endpoint, cache_key((player_id,), {}, week)
+            )
+            if value is MISSING:
+                missing.append(player_id)
+            else:
+                values[player_id] = value
+        return values, missing
+
+    def cache_player_values(self, league_key, endpoint, week, values):
+        for player_id, value in values.items():
+            league_cache.set(
+                league_key, endpoint, cache_key((player_id,), {}, week), value
+            )
+        return values
+
+    def owners_from_ownership(self, ownership, player_ids):
+        return {
+            player_id: self.owner_from_ownership(ownership[player_id])
+            for player_id in player_ids
+            if player_id in ownership
+        }
+
+    def get_player_owners(self, player_ids):
+        """Owners of ``player_ids`` keyed by player id.
+
+        Players that aren't cached yet are looked up in a single ownership
+        request.
+        """
+        player_ids = list(dict.fromkeys(str(p) for p in player_ids))
+        try:
+            league = self.league()
+            week = league.current_week()
+            owners, missing = self.cached_player_values(
+                league.league_id, "player_owner", week, player_ids
+            )
+            if missing:
+                owners.update(
+                    self.cache_player_values(
+                        league.league_id,
+                        "player_owner",
+                        week,
+                        self.owners_from_ownership(
+                            league.ownership(missing), missing
+                        ),
+                    )
+                )
+            return owners
+        except Exception:
+            logger.exception(
+                "Error while fetching ownership for player ids: \
+                    {} in league {}".format(
+                    player_ids, self.league_id
+                )
+            )
+            return {}
+
+    async def get_player_owners_async(self, player_ids):
+        player_ids = list(dict.fromkeys(str(p) for p in player_ids))
+        try:
+            handle = await self.league_handle_async()
+            owners, missing = self.cached_player_values(
+                handle.league_key,
+                "player_owner",
+                handle.current_week,
+                player_ids,
+            )
+            if missing:
+                ownership = await self.fetch(
+                    lambda league: league.ownership(missing)
+                )
+                owners.update(
+                    self.cache_player_values(
+                        handle.league_key,
+                        "player_owner",
+                        handle.current_week,
+                        self.owners_from_ownership(ownership, missing),
+                    )
+                )
+            return owners
+        except Exception:
+            logger.exception(
+                "Error while fetching ownership for player ids: \
+                    {} in league {}".format(
+                    player_ids, self.league_id
+                )
+            )
+            return {}
+
+    def get_player_owner(self, player_id):
+        return self.get_player_owners([player_id]).get(str(player_id))
+
+    async def get_player_owner_async(self, player_id):
+        return (await self.get_player_owners_async([player_id])).get(
+            str(player_id)
+        )
+
+    def headshots_from_players(self, players):
+        return {
+            str(player["player_id"]): player["headshot"]["url"]
+            for player in players
+            if "headshot" in player
+        }
+
+    def stored_headshots(self, player_ids):
+        return {
+            player_id: player.headshot_url
+            for player_id, player in get_players(
+                self.league_type, player_ids
+            ).items()
+            if player.headshot_url
+        }
+
+    def get_player_headshots(self, player_ids):
+        """Headshot urls of ``player_ids`` keyed by player id.
+
+        Players that aren't cached or in the player store yet are looked up
+        in one bulk player request.
+        """
+        player_ids = list(dict.fromkeys(str(p) for p in player_ids))
+        try:
+            league = self.league()
+            headshots, missing = self.cached_player_values(
+                league.league_id, "player_headshot", None, player_ids
+            )
+            headshots.update(
+                self.cache_player_values(
+                    league.league_id,
+                    "player_headshot",
+                    None,
+                    self.stored_headshots(missing),
+                )
+            )
+            missing = [p for p in missing if p not in headshots]
+            if missing:
+                players = league.player_details([int(p) for p in missing])
+                save_players(self.league_type, players)
+                headshots.update(
+                    self.cache_player_values(
+                        league.league_id,
+                        "player_headshot",
+                        None,
+                        self.headshots_from_players(players),
+                    )
+                )
+            return headshots
+        except Exception:
+            logger.exception(
+                "Error while fetching headshots for player ids: \
+                    {} in league {}".format(
+                    player_ids, self.league_id
+                )
+            )
+            return {}
+
+    async def get_player_headshots_async(self, player_ids):
+        player_ids = list(dict.fromkeys(str(p) for p in player_ids))
+        try:
+            handle = await self.league_handle_async()
+            headshots, missing = self.cached_player_values(
+                handle.league_key, "player_headshot", None, player_ids
+            )
+            headshots.update(
+                self.cache_player_values(
+                    handle.league_key,
+                    "player_headshot",
+                    None,
+                    await run_db(self.stored_headshots, missing),
+                )
+            )
+            missing = [p for p in missing if p not in headshots]
+            if missing:
+                players = await self.fetch(
+                    lambda league: league.player_details(
+                        [int(p) for p in missing]
+                    )
+                )
+                await run_db(save_players, self.league_type, players)
+                headshots.update(
+                    self.cache_player_values(
+                        handle.league_key,
+                        "player_headshot",
+                        None,
+                        self.headshots_from_players(players),
+                    )
+                )
+            return headshots
+        except Exception:
+            logger.exception(
+                "Error while fetching headshots for player ids: \
+                    {} in league {}".format(
+                    player_ids, self.league_id
+                )
+            )
+            return {}
+
+    async def refresh_players_async(self, start=0, pages=1):
+        """Refresh part of the player store for this league's game."""
+        await self.check_token_async()
+        return await refresh_players(
+            self.oauth, self.league_type, start, pages
+        )
+
+    def matchups_from_league(self, league):
+        week, matchups = parse_scoreboard(league.matchups())
+        details = []
+        divider = "--------------------------------------"
+        for matchup in matchups:
+            team1_details = self.get_matchup_details(matchup.teams[0])
+            team2_details = self.get_matchup_details(matchup.teams[1])
+            details.append(
+                {
+                    "name": "{} vs {}".format(
+                        team1_details["name"], team2_details["name"]
+                    ),
+                    "value": team1_details["text"]
+                    + team2_details["text"]
+                    + divider,
+                }
+            )
+        return str(week), details
+
+    @league_cached("matchups")
+    def get_matchups(self):
+        try:
+            return self.matchups_from_league(self.league())
+        except Exception:
+            logger.exception(
+                "Error while fetching matchups for league: {}".format(
+                    self.league_id
+                )
+            )
+
+    @league_cached_async("matchups")
+    async def get_matchups_async(self):
+        try:
+            return await self.fetch(self.matchups_from_league)
+        except Exception:
+            logger.exception(
+                "Error while fetching matchups for league: {}".format(
+                    self.league_id
+                )
+            )
+
+    def get_matchup_details(self, team):
+        team_details = ""
+        if self.scoring_type == "head":
+            # handle data for head to head scoring
+            if team.win_probability is not None:
+                team_details = "***{}*** \n Projected Score: {} \n  \
+                            Actual Score: {} \n Win Probability: {} \n".format(
+                    team.name,
+                    team.projected_points,
+                    team.points,
+                    "{:.0%}".format(team.win_probability),
+                )
+            else:
+                team_details = "***{}*** \n Projected Score: {} \n  \
+                            Actual Score: {} \n".format(
+                    team.name,
+                    team.projected_points,
+                    team.points,
+                )
+        else:
+            team_details = "***{}*** \n Score: {} \n  \
+                            Remaining Games: {} \n \
+                                Live Games: {} \n \
+                                    Completed Games: {} \n".format(
+                team.name,
+                team.points,
+                team.remaining_games,
+                team.live_games,
+                team.completed_games,
+            )
+        return {"name": team.name, "text": team_details}
+
+    @league_cached("latest_trade", per_guild=True)
+    def get_latest_trade(self):
+        try:
+            league = self.league()
+            for key, values in league.teams().items():
+                if "is_owned_by_current_login" in values:
+                    team = league.to_team(key)
+                    with tracer.span("Team.proposed_trades"):
+                        proposed_trades = team.proposed_trades()
+                    accepted_trades = list(
+                        filter(
+                            lambda d: d["status"] == "accepted",
+                            proposed_trades,
+                        )
+                    )
+                    if accepted_trades:
+                        return accepted_trades[0]
+            return
+        except Exception:
+            logger.exception("Error while fetching latest trade")
+
+    def normalize_trade_data(self, trade_data):
+        normalized_data = {
+            "transaction_key": trade_data["transaction_key"],
+            "transaction_id": trade_data["transaction_id"],
+            "type": trade_data["type"],
+            "status": trade_data["status"],
+            "timestamp": trade_data["timestamp"],
+            "trader_team_key": trade_data["trader_team_key"],
+            "trader_team_name": trade_data["trader_team_name"],
+            "tradee_team_key": trade_data["tradee_team_key"],
+            "tradee_team_name": trade_data["tradee_team_name"],
+            "player_count": trade_data["players"].get("count", 0),
+            "players": [],
+        }
+
+        for i in range(normalized_data["player_count"]):
+            player_info = trade_data["players"][str(i)]
+
+            player_data = player_info.get("player", [])[0]
+
+            transaction_data = player_info.get("player", [])[1]["transaction_data"]
+
+            player = {
+                "player_key": player_data[0]["player_key"],
+                "player_id": player_data[1]["player_id"],
+                "name": player_data[2]["name"]["full"],
+                "team_abbr": player_data[3]["editorial_team_abbr"],
+                "display_position": player_data[4]["display_position"],
+                "position_type": player_data[5]["position_type"],
+                "source_team_name": transaction_data[0].get("source_team_name", ""),
+                "destination_team_name": transaction_data[0].get("destination_team_name", ""),
+            }
+
+            normalized_data["players"].append(player)
+
+        return normalized_data
+
+    def trades_from_transactions(self, transactions):
+        ts = datetime.now() - timedelta(hours=1)
+        filtered_transactions = [
+            t
+            for t in transactions
+            if int(t["timestamp"]) > ts.timestamp()
+            and t["status"] == "successful"
+        ]
+        logger.info(f"found {len(transactions)} trades")
+        trades = []
+        for transaction in filtered_transactions:
+            trades.append(self.normalize_trade_data(transaction))
+        return trades
+
+    def get_latest_trades(self):
+        transactions = self.league().transactions("trade", "")
+        return self.trades_from_transactions(transactions)
+
+    async def get_latest_trades_async(self):
+        transactions = await self.fetch(
+            lambda league: league.transactions("trade", "")
+        )
+        return self.trades_from_transactions(transactions)
+
+    def waivers_from_transactions(self, transactions):
+        ts = datetime.now() - timedelta(days=1)
+        filtered_transactions = [
+            t for t in transactions if int(t["timestamp"]) > ts.timestamp()
+        ]
+        return filtered_transactions
+
+    def get_latest_waiver_transactions(self):
+        transactions = self.league().transactions("add,drop", "")
+        return self.waivers_from_transactions(transactions)
+
+    async def get_latest_waiver_transactions_async(self):
+        transactions = await self.fetch(
+            lambda league: league.transactions("add,drop", "")
+        )
+        return self.waivers_from_transactions(transactions)
+
+    def transactions_since(self, transactions, cursor):
+        """Transactions newer than ``cursor``, oldest first."""
+        return sorted(
+            [t for t in transactions if transaction_position(t) > cursor],
+            key=transaction_position,
+        )
+
+    async def get_transactions_since_async(self, cursor):
+        count = settings.get("poller_transaction_count", 25)
+        waivers, trades = await self.fetch_all(
+            lambda league: league.transactions("add,drop", count),
+            lambda league: league.transactions("trade", count),
+        )
+        for transactions in (waivers, trades):
+            if len(transactions) >= count and all(
+                transaction_position(t) > cursor for t in transactions
+            ):
+                logger.warning(
+                    "More than {} new transactions for league {}, older "
+                    "ones were skipped".format(count, self.league_id)
+                )
+        trades = [
+            self.normalize_trade_data(t)
+            for t in trades
+            if t["status"] == "successful"
+        ]
+        return self.transactions_since(waivers + trades, cursor)
@@ -0,0 +1,228 @@
+import aiohttp
+import asyncio
+import logging
+
+from contextlib import contextmanager
+from yahoo_fantasy_api import yhandler
+
+from harambot.config import settings
+from harambot.metrics import yahoo_errors, yahoo_latency
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_CONNECTIONS = 32
+DEFAULT_KEEPALIVE = 60
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+# status Yahoo answers with when it rate limits a client
+THROTTLED = 999
+
+
+def api_endpoint():
+    """Base url of the Fantasy API, YAHOO_API_URL points it elsewhere."""
+    return settings.get("yahoo_api_url", yhandler.YAHOO_ENDPOINT)
+
+
+def endpoint_path(uri):
+    """Request path without keys or parameters, used as a metric label.
+
+    ``league/414.l.1/players;player_keys=414.p.1/ownership`` becomes
+    ``league/players/ownership``.
+    """
+    segments = [
+        segment.split(";")[0] for segment in uri.split("?")[0].split("/")
+    ]
+    return "/".join(
+        segment
+        for segment in segments
+        if segment and not any(c.isdigit() for c in segment)
+    )
+
+
+@contextmanager
+def timed_request(uri):
+    endpoint = endpoint_path(uri)
+    try:
+        with yahoo_latency.time(endpoint=endpoint):
+            yield
+    except Exception:
+        yahoo_errors.inc(endpoint=endpoint)
+        raise
+
+
+class TimedHandler(yhandler.YHandler):
+    """YHandler that records each request in the Yahoo metrics.
+
+    Also sends requests to ``api_endpoint()`` rather than the endpoint
+    hard coded in yahoo_fantasy_api.
+    """
+
+    def get(self, uri):
+        with timed_request(uri):
+            response = self.sc.session.get(
+                "{}/{}".format(api_endpoint(), uri), params={"format": "json"}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(response.content)
+            return response.json()
+
+
+class MissingResponse(Exception):
+    def __init__(self, uri):
+        super().__init__(uri)
+        self.uri = uri
+
+
+class Unauthorized(RuntimeError):
+    """The access token was rejected, refreshing it may help."""
+
+
+class Throttled(RuntimeError):
+    """Yahoo is rate limiting us."""
+
+
+class PrefetchedHandler(yhandler.YHandler):
+    """YHandler that only serves responses that were already fetched.
+
+    yahoo_fantasy_api parses everything synchronously through its
+    YHandler. Swapping in this handler lets us reuse that parsing while the
+    actual requests go out through aiohttp: any URI that hasn't been
+    fetched yet raises MissingResponse so the caller can fetch it and run
+    the parse again.
+    """
+
+    def __init__(self, responses):
+        super().__init__(None)
+        self.responses = responses
+
+    def get(self, uri):
+        if uri not in self.responses:
+            raise MissingResponse(uri)
+        return self.responses[uri]
+
+
+class AsyncYahooClient:
+    """Asyncio client for the Yahoo Fantasy API.
+
+    A single aiohttp session (and keep-alive connection pool) is shared by
+    every guild, only the bearer token differs per request.
+    """
+
+    def __init__(self):
+        self.session = None
+
+    @property
+    def endpoint(self):
+        return api_endpoint()
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.get(
+                    "yahoo_client_connections", DEFAULT_CONNECTIONS
+                ),
+                keepalive_timeout=settings.get(
+                    "yahoo_client_keepalive", DEFAULT_KEEPALIVE
+                ),
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=settings.get("yahoo_client_timeout", DEFAULT_TIMEOUT)
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout
+            )
+        return self.session
+
+    async def request(self, oauth, uri):
+        with timed_request(uri):
+            async with self.get_session().get(
+                "{}/{}".format(self.endpoint, uri),
+                params={"format": "json"},
+                headers={
+                    "Authorization": "Bearer {}".format(oauth.access_token)
+                },
+            ) as response:
+                if response.status == 401:
+                    raise Unauthorized(await response.read())
+                if response.status == THROTTLED:
+                    raise Throttled(await response.read())
+                if response.status != 200:
+                    raise RuntimeError(await response.read())
+                return await response.json(content_type=None)
+
+    async def get(self, oauth, uri):
+        """Fetch ``uri``, backing off and retrying while throttled."""
+        retries = settings.get("yahoo_client_retries", DEFAULT_RETRIES)
+        backoff = settings.get("yahoo_client_backoff", DEFAULT_BACKOFF)
+        for attempt in range(retries + 1):
+            try:
+                return await self.request(oauth, uri)
+            except Throttled:
+                if attempt == retries:
+                    raise
+                delay = backoff * 2**attempt
+                logger.warning(
+                    "Throttled fetching {}, retrying in {}s".format(uri, delay)
+                )
+                await asyncio.sleep(delay)
+
+    async def call(self, oauth, func, refresh=None):
+        """Run ``func(handler)`` fetching every URI it needs with aiohttp.
+
+        ``func`` is given a YHandler and should build whatever
+        yahoo_fantasy_api objects it needs on top of it. ``refresh`` is
+        awaited for a new OAuth2 session when the token is rejected, the
+        request is then retried once.
+        """
+        return (await self.call_all(oauth, [func], refresh))[0]
+
+    async def call_all(self, oauth, funcs, refresh=None):
+        """Like ``call`` for several independent ``funcs`` at once.
+
+        Each round runs every unfinished ``func`` and fetches the URIs
+        they are missing concurrently, so independent requests don't wait
+        on each other.
+        """
+        responses = {}
+        results = [None] * len(funcs)
+        pending = dict(enumerate(funcs))
+        refreshed = False
+        while pending:
+            missing = {}
+            for index, func in list(pending.items()):
+                try:
+                    results[index] = func(PrefetchedHandler(responses))
+                    del pending[index]
+                except MissingResponse as e:
+                    missing[e.uri] = None
+            if not missing:
+                break
+            logger.debug("fetching {}".format(", ".join(missing)))
+            fetched = await asyncio.gather(
+                *[self.get(oauth, uri) for uri in missing],
+                return_exceptions=True,
+            )
+            unauthorized = None
+            for uri, response in zip(missing, fetched):
+                if isinstance(response, Unauthorized):
+                    unauthorized = response
+                elif isinstance(response, BaseException):
+                    raise response
+                else:
+                    responses[uri] = response
+            if unauthorized is not None:
+                if refresh is None or refreshed:
+                    raise unauthorized
+                refreshed = True
+                oauth = await refresh()
+        return results
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+yahoo_client = AsyncYahooClient()
@@ -0,0 +1,490 @@
+"""Load test for YahooCog and the transaction poller with many guilds.
+
+Simulates guilds, each with its own Guild row, league and channel, sending
+a mix of ``/standings``, ``/matchups``, ``/roster``, ``/stats`` and
+``/waivers`` while the poller runs, against the Yahoo stand-in in
+``loadtest/yahoo_server.py``. Every step adds guilds and reports command
+latency, event loop lag and Yahoo calls per command::
+
+    python -m loadtest.harness --guilds 10 50 100 250 --duration 60 \\
+        --latency 0.1 --output loadtest/results/run.json
+
+The stand-in is started in its own process so its work doesn't show up
+as event loop lag, pass ``--yahoo-url`` to use one that is already
+running. Guild rows are written to the configured database and deleted
+after each step, leave DATABASE_URL unset to use an in memory one.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from harambot.cache import guild_cache, league_cache, render_cache
+from harambot.cache import single_flight
+from harambot.cogs.yahoo import YahooCog
+from harambot.config import settings
+from harambot.database.models import database, Guild, Player
+from harambot.database.models import PollerLease, PollerWorker
+from harambot.message_queue import message_queue
+from harambot.yahoo_client import yahoo_client
+from loadtest.yahoo_server import GAME_IDS, Game
+
+# far from real discord ids so rows left behind are easy to spot
+GUILD_ID_BASE = 9000000000
+COMMANDS = ["standings", "matchups", "roster", "stats", "waivers"]
+DEFAULT_MIX = {
+    "standings": 30,
+    "matchups": 30,
+    "roster": 15,
+    "stats": 15,
+    "waivers": 10,
+}
+
+# which command, or "poll", the Yahoo calls made in this context are for
+current_label = contextvars.ContextVar("current_label", default="background")
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+
+class Sender:
+    """Stand-in for anything discord.py sends messages through."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+
+    async def __call__(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+class InteractionResponse:
+    def __init__(self, sender):
+        self.send_message = sender
+        self.defer = sender
+
+
+class Followup:
+    def __init__(self, sender):
+        self.send = sender
+
+
+class Interaction:
+    ids = itertools.count(1)
+
+    def __init__(self, guild_id, channel_id, sender):
+        self.id = next(self.ids)
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.response = InteractionResponse(sender)
+        self.followup = Followup(sender)
+
+
+class Channel:
+    def __init__(self, channel_id, sender):
+        self.id = channel_id
+        self.send = sender
+
+
+class Bot:
+    def __init__(self, sender):
+        self.sender = sender
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = Channel(channel_id, self.sender)
+        return self.channels[channel_id]
+
+    def get_cog(self, name):
+        return None
+
+
+def clear_caches():
+    league_cache.clear()
+    single_flight.clear()
+    render_cache.clear()
+    guild_cache.clear()
+
+
+def create_guilds(count, game_code):
+    guild_ids = [str(GUILD_ID_BASE + i) for i in range(count)]
+    # far enough back that the first poll finds something to post
+    checked = datetime.now() - timedelta(hours=1)
+    with database.atomic():
+        for guild_id in guild_ids:
+            Guild.create(
+                guild_id=guild_id,
+                access_token="loadtest",
+                refresh_token="loadtest",
+                expires_in=3600,
+                token_type="bearer",
+                token_time=int(time.time()),
+                league_id=str(int(guild_id) - GUILD_ID_BASE + 1000),
+                league_type=game_code,
+                RIP_text="RIP",
+                RIP_image_url="",
+                last_transaction_check=checked,
+                channel_id=guild_id,
+            )
+    return guild_ids
+
+
+def delete_guilds(guild_ids):
+    Guild.delete().where(Guild.guild_id.in_(guild_ids)).execute()
+
+
+class LoadTest:
+    """One step of the load test: ``guilds`` guilds for ``duration``s.
+
+    Every guild sends commands at ``rate`` per minute on average with
+    random arrivals, independently of how long earlier commands take, so
+    a slow bot sees the same load as a fast one.
+    """
+
+    def __init__(
+        self,
+        guilds,
+        duration=60,
+        rate=2.0,
+        mix=None,
+        poll_interval=60,
+        discord_latency=0.05,
+        game_code="nfl",
+        teams=12,
+        seed=None,
+    ):
+        self.guilds = guilds
+        self.duration = duration
+        self.rate = rate
+        self.mix = mix or DEFAULT_MIX
+        self.poll_interval = poll_interval
+        self.game_code = game_code
+        self.teams = teams
+        self.random = random.Random(seed)
+        self.sender = Sender(discord_latency)
+        self.player_names = [
+            "{} {}".format(player["first"], player["last"])
+            for player in Game(game_code).players
+        ]
+        self.latencies = {command: [] for command in COMMANDS}
+        self.failures = {command: 0 for command in COMMANDS}
+        self.yahoo_calls = {}
+        self.polls = 0
+        self.loop_lag = []
+
+    def command_args(self, command, guild_id):
+        league_id = int(guild_id) - GUILD_ID_BASE + 1000
+        if command == "roster":
+            # team names the stand-in generates for the league
+            return (
+                "Team {} {}".format(
+                    league_id, self.random.randint(1, self.teams)
+                ),
+            )
+        if command == "stats":
+            return (self.random.choice(self.player_names),)
+        return ()
+
+    def patch_yahoo_client(self):
+        get = yahoo_client.get
+
+        async def counted(oauth, uri):
+            label = current_label.get()
+            self.yahoo_calls[label] = self.yahoo_calls.get(label, 0) + 1
+            return await get(oauth, uri)
+
+        yahoo_client.get = counted
+        return lambda: vars(yahoo_client).pop("get", None)
+
+    async def run_command(self, cog, command, guild_id):
+        current_label.set(command)
+        interaction = Interaction(int(guild_id), int(guild_id), self.sender)
+        args = self.command_args(command, guild_id)
+        start = time.monotonic()
+        try:
+            await getattr(cog, command).callback(cog, interaction, *args)
+        except Exception:
+            self.failures[command] += 1
+        self.latencies[command].append(time.monotonic() - start)
+
+    async def send_commands(self, cog, guild_id, deadline, pending):
+        commands = list(self.mix)
+        weights = [self.mix[command] for command in commands]
+        while True:
+            await asyncio.sleep(self.random.expovariate(self.rate / 60))
+            if time.monotonic() >= deadline:
+                return
+            command = self.random.choices(commands, weights)[0]
+            task = asyncio.create_task(
+                self.run_command(cog, command, guild_id)
+            )
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    async def sample_loop_lag(self, interval=0.05):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, time.monotonic() - start - interval))
+
+    async def run(self):
+        guild_ids = create_guilds(self.guilds, self.game_code)
+        clear_caches()
+        restore = self.patch_yahoo_client()
+        cog = YahooCog(Bot(self.sender), "loadtest", "loadtest")
+        cog.poller.interval = self.poll_interval
+        poll_guild = cog.poller.poll_guild
+
+        async def labelled_poll(guild_id, channel_id):
+            current_label.set("poll")
+            await poll_guild(guild_id, channel_id)
+            self.polls += 1
+
+        cog.poller.poll_guild = labelled_poll
+        sampler = asyncio.create_task(self.sample_loop_lag())
+        pending = set()
+        start = time.monotonic()
+        try:
+            await cog.cog_load()
+            await asyncio.gather(
+                *[
+                    self.send_commands(
+                        cog, guild_id, start + self.duration, pending
+                    )
+                    for guild_id in guild_ids
+                ]
+            )
+            if pending:
+                await asyncio.wait(pending, timeout=self.duration)
+        finally:
+            elapsed = time.monotonic() - start
+            sampler.cancel()
+            poller_lag = list(cog.poller.lag.values())
+            await cog.cog_unload()
+            restore()
+            delete_guilds(guild_ids)
+            clear_caches()
+        return self.results(elapsed, poller_lag)
+
+    def results(self, elapsed, poller_lag):
+        commands = {}
+        for command, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            commands[command] = dict(
+                summarize(latencies),
+                failures=self.failures[command],
+                yahoo_calls=self.yahoo_calls.get(command, 0) / len(latencies),
+            )
+        every = list(itertools.chain(*self.latencies.values()))
+        return {
+            "guilds": self.guilds,
+            "elapsed": elapsed,
+            "throughput": len(every) / elapsed,
+            "latency": summarize(every),
+            "commands": commands,
+            "polls": self.polls,
+            "yahoo_calls_per_poll": self.yahoo_calls.get("poll", 0)
+            / max(self.polls, 1),
+            "poller_lag": summarize(poller_lag),
+            "event_loop_lag": summarize(self.loop_lag),
+            "yahoo_calls": dict(self.yahoo_calls),
+            "message_queue": message_queue.stats(),
+        }
+
+
+async def standin_stats(stats_url):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(stats_url) as response:
+            stats = await response.json()
+    return {
+        "requests": sum(stats["requests"].values()),
+        "errors": stats["errors"],
+        "throttled": stats["throttled"],
+    }
+
+
+async def run(yahoo_url, steps, **options):
+    database.create_tables([Guild, Player, PollerLease, PollerWorker])
+    settings.set("yahoo_api_url", yahoo_url)
+    stats_url = yahoo_url.split("/fantasy/")[0] + "/_stats"
+    results = []
+    for guilds in steps:
+        before = await standin_stats(stats_url)
+        result = await LoadTest(guilds, **options).run()
+        after = await standin_stats(stats_url)
+        result["yahoo"] = {name: after[name] - before[name] for name in after}
+        results.append(result)
+        print_step(result)
+    await yahoo_client.close()
+    return results
+
+
+def print_step(result):
+    print(
+        "{guilds:5} guilds {throughput:7.1f} cmd/s  p50 {p50:7.1f}ms  "
+        "p99 {p99:7.1f}ms  loop lag p99 {lag:6.1f}ms  "
+        "{polls} polls  {requests} yahoo requests".format(
+            guilds=result["guilds"],
+            throughput=result["throughput"],
+            p50=result["latency"]["p50"] * 1000,
+            p99=result["latency"]["p99"] * 1000,
+            lag=result["event_loop_lag"]["p99"] * 1000,
+            polls=result["polls"],
+            requests=result["yahoo"]["requests"],
+        )
+    )
+    for command, stats in result["commands"].items():
+        print(
+            "      {:10} {:5} calls  p50 {:7.1f}ms  p99 {:7.1f}ms  "
+            "{:5.2f} yahoo/cmd  {} failed".format(
+                command,
+                stats["count"],
+                stats["p50"] * 1000,
+                stats["p99"] * 1000,
+                stats["yahoo_calls"],
+                stats["failures"],
+            )
+        )
+
+
+def start_standin(args, port):
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "loadtest.yahoo_server",
+            "--port",
+            str(port),
+            "--latency",
+            str(args.latency),
+            "--error-rate",
+            str(args.error_rate),
+            "--throttle-rate",
+            str(args.throttle_rate),
+            "--teams",
+            str(args.teams),
+            "--transaction-interval",
+            str(args.transaction_interval),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    stats_url = "http://127.0.0.1:{}/_stats".format(port)
+    for _ in range(100):
+        try:
+            asyncio.run(standin_stats(stats_url))
+            break
+        except aiohttp.ClientError:
+            time.sleep(0.1)
+    return process
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--guilds", type=int, nargs="+", default=[10, 50, 100, 250]
+    )
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="commands per guild a minute"
+    )
+    parser.add_argument(
+        "--mix",
+        type=json.loads,
+        help='command weights, e.g. \'{"standings": 1, "waivers": 1}\'',
+    )
+    parser.add_argument("--poll-interval", type=float, default=60)
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument(
+        "--game", default="nfl", choices=sorted(GAME_IDS), dest="game_code"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--yahoo-url", help="an already running stand-in")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--transaction-interval", type=float, default=60)
+    parser.add_argument("--output", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+    if args.mix and set(args.mix) - set(COMMANDS):
+        parser.error("--mix commands must be in {}".format(COMMANDS))
+
+    process = None
+    yahoo_url = args.yahoo_url
+    if yahoo_url is None:
+        process = start_standin(args, args.port)
+        yahoo_url = "http://127.0.0.1:{}/fantasy/v2".format(args.port)
+    # commands log on every call, that isn't what is being measured
+    logging.disable(logging.INFO)
+    try:
+        results = asyncio.run(
+            run(
+                yahoo_url,
+                args.guilds,
+                duration=args.duration,
+                rate=args.rate,
+                mix=args.mix,
+                poll_interval=args.poll_interval,
+                discord_latency=args.discord_latency,
+                game_code=args.game_code,
+                teams=args.teams,
+                seed=args.seed,
+            )
+        )
+    finally:
+        logging.disable(logging.NOTSET)
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        os.makedirs(
+            os.path.dirname(os.path.abspath(args.output)), exist_ok=True
+        )
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "version": settings.get("version"),
+                    "python": platform.python_version(),
+                    "timestamp": int(time.time()),
+                    "steps": results,
+                },
+                f,
+                indent=2,
+            )
+        print("results written to {}".format(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
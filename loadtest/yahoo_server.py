@@ -0,0 +1,683 @@
+"""Local stand-in for the Yahoo Fantasy v2 API.
+
+Serves the endpoints harambot uses with generated leagues so load tests
+can run offline and without Yahoo's quotas::
+
+    python -m loadtest.yahoo_server --port 8099 --latency 0.05 \\
+        --error-rate 0.01 --throttle-rate 0.01
+
+Point harambot at it with ``YAHOO_API_URL=http://localhost:8099/fantasy/v2``
+(``HARAMBOT_YAHOO_API_URL`` in the environment). Any bearer token is
+accepted, guilds should be created with a fresh ``token_time`` since token
+refreshes still go to Yahoo.
+
+Every league key gets a stable generated league: teams, rosters drawn
+from the game's player pool, a scoreboard whose points move every
+``--score-interval`` seconds and a new transaction every
+``--transaction-interval`` seconds. A payload recorded from Yahoo can be
+served instead by dropping it in ``--recordings`` named after the
+request path without keys, e.g. ``league_scoreboard.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from aiohttp import web
+
+from harambot.yahoo_client import endpoint_path
+
+GAME_IDS = {"nfl": "423", "nba": "428", "mlb": "431", "nhl": "427"}
+POSITIONS = ["QB", "RB", "RB", "WR", "WR", "WR", "TE", "K", "DEF"]
+TEAMS = ["Buf", "KC", "Sea", "Phi", "SF", "Dal", "Mia", "Det", "Bal", "Cin"]
+FIRST_NAMES = ["Josh", "Patrick", "DK", "Jalen", "Tyreek", "Travis", "Justin"]
+LAST_NAMES = ["Allen", "Mahomes", "Metcalf", "Hurts", "Hill", "Kelce", "Lee"]
+PLAYER_POOL = 600
+ROSTER_SIZE = 15
+SEASON = "2023"
+THROTTLED = 999
+
+
+def content(**resources):
+    return {"fantasy_content": resources}
+
+
+def collection(items):
+    resource = {str(i): item for i, item in enumerate(items)}
+    resource["count"] = len(items)
+    return resource
+
+
+def parse_segment(segment):
+    """``players;start=0;count=25`` -> ``("players", {...})``"""
+    name, *params = segment.split(";")
+    return name, dict(param.split("=", 1) for param in params if "=" in param)
+
+
+class Game:
+    def __init__(self, code):
+        self.code = code
+        self.game_id = GAME_IDS.get(code, "999")
+        rng = random.Random(code)
+        self.players = [
+            {
+                "player_id": str(i + 1),
+                "player_key": "{}.p.{}".format(self.game_id, i + 1),
+                "first": rng.choice(FIRST_NAMES),
+                "last": "{}{}".format(rng.choice(LAST_NAMES), i + 1),
+                "team_abbr": rng.choice(TEAMS),
+                "position": rng.choice(POSITIONS),
+                "uniform_number": str(rng.randint(1, 99)),
+            }
+            for i in range(PLAYER_POOL)
+        ]
+        self.by_id = {player["player_id"]: player for player in self.players}
+        self.by_name = {}
+        for player in self.players:
+            self.by_name.setdefault(self.full_name(player), player)
+
+    def full_name(self, player):
+        return "{} {}".format(player["first"], player["last"])
+
+    def player_meta(self, player):
+        return [
+            {"player_key": player["player_key"]},
+            {"player_id": player["player_id"]},
+            {
+                "name": {
+                    "full": self.full_name(player),
+                    "first": player["first"],
+                    "last": player["last"],
+                }
+            },
+            {"editorial_team_abbr": player["team_abbr"]},
+            {"display_position": player["position"]},
+            {"position_type": "DT" if player["position"] == "DEF" else "O"},
+        ]
+
+    def player_details(self, player):
+        return self.player_meta(player) + [
+            {"uniform_number": player["uniform_number"]},
+            {"primary_position": player["position"]},
+            {"bye_weeks": {"week": "7"}},
+            {"eligible_positions": [{"position": player["position"]}]},
+            {
+                "headshot": {
+                    "url": "https://example.com/headshots/{}.png".format(
+                        player["player_id"]
+                    ),
+                    "size": "small",
+                }
+            },
+            {
+                "image_url": "https://example.com/images/{}.png".format(
+                    player["player_id"]
+                )
+            },
+        ]
+
+
+class League:
+    def __init__(self, server, game, league_key):
+        self.server = server
+        self.game = game
+        self.league_key = league_key
+        self.league_id = league_key.split(".l.")[-1]
+        rng = random.Random(league_key)
+        players = list(game.players)
+        rng.shuffle(players)
+        self.teams = []
+        for i in range(server.teams):
+            self.teams.append(
+                {
+                    "team_key": "{}.t.{}".format(league_key, i + 1),
+                    "team_id": str(i + 1),
+                    "name": "Team {} {}".format(self.league_id, i + 1),
+                    "roster": players[
+                        i * ROSTER_SIZE : (i + 1) * ROSTER_SIZE  # noqa: E203
+                    ],
+                }
+            )
+        self.free_agents = players[server.teams * ROSTER_SIZE :]  # noqa: E203
+        self.created = server.started - 10 * server.transaction_interval
+
+    def team_meta(self, team):
+        return [
+            {"team_key": team["team_key"]},
+            {"team_id": team["team_id"]},
+            {"name": team["name"]},
+            {"url": "https://example.com/teams/{}".format(team["team_id"])},
+            {"managers": [{"manager": {"nickname": team["name"]}}]},
+        ]
+
+    def meta(self):
+        return {
+            "league_key": self.league_key,
+            "league_id": self.league_id,
+            "name": "League {}".format(self.league_id),
+            "num_teams": len(self.teams),
+            "scoring_type": self.server.scoring_type,
+            "current_week": self.server.week,
+            "season": SEASON,
+            "game_code": self.game.code,
+        }
+
+    def settings(self):
+        return content(
+            league=[self.meta(), {"settings": [{"uses_playoff": "1"}]}]
+        )
+
+    def standings(self):
+        rng = random.Random(self.league_key + "standings")
+        teams = []
+        for rank, team in enumerate(self.teams):
+            wins = rng.randint(0, self.server.week)
+            teams.append(
+                {
+                    "team": [
+                        self.team_meta(team),
+                        {"team_points": {"total": str(rng.randint(0, 999))}},
+                        {
+                            "team_standings": {
+                                "rank": str(rank + 1),
+                                "outcome_totals": {
+                                    "wins": str(wins),
+                                    "losses": str(self.server.week - wins),
+                                    "ties": "0",
+                                },
+                            }
+                        },
+                    ]
+                }
+            )
+        return content(
+            league=[self.meta(), {"standings": [{"teams": collection(teams)}]}]
+        )
+
+    def teams_payload(self):
+        return content(
+            league=[
+                self.meta(),
+                {
+                    "teams": collection(
+                        [{"team": [self.team_meta(t)]} for t in self.teams]
+                    )
+                },
+            ]
+        )
+
+    def team_stats(self, index, week):
+        # points move every score interval so live boards have something
+        # to update
+        tick = int(time.time() // self.server.score_interval)
+        rng = random.Random("{}{}{}".format(self.league_key, index, week))
+        points = (rng.random() * 20 + (tick % 60) * (index % 4 + 1)) % 160
+        if self.server.scoring_type == "head":
+            return {
+                "win_probability": round(rng.random(), 2),
+                "team_points": {"total": "{:.2f}".format(points)},
+                "team_projected_points": {
+                    "total": "{:.2f}".format(rng.random() * 40 + 90)
+                },
+            }
+        return {
+            "team_points": {"total": str(int(points) % 10)},
+            "team_remaining_games": {
+                "total": {
+                    "remaining_games": tick % 40,
+                    "live_games": tick % 3,
+                    "completed_games": 40 - tick % 40,
+                }
+            },
+        }
+
+    def scoreboard(self, week):
+        matchups = []
+        for i in range(0, len(self.teams) - 1, 2):
+            matchups.append(
+                {
+                    "matchup": {
+                        "week": str(week),
+                        "status": "midevent",
+                        "0": {
+                            "teams": collection(
+                                [
+                                    {
+                                        "team": [
+                                            self.team_meta(self.teams[j]),
+                                            self.team_stats(j, week),
+                                        ]
+                                    }
+                                    for j in (i, i + 1)
+                                ]
+                            )
+                        },
+                    }
+                }
+            )
+        return content(
+            league=[
+                self.meta(),
+                {
+                    "scoreboard": {
+                        "week": week,
+                        "0": {"matchups": collection(matchups)},
+                    }
+                },
+            ]
+        )
+
+    def team(self, team_key):
+        for team in self.teams:
+            if team["team_key"] == team_key:
+                return team
+        raise web.HTTPNotFound(text="unknown team {}".format(team_key))
+
+    def roster(self, team_key, week):
+        team = self.team(team_key)
+        players = []
+        for player in team["roster"]:
+            meta = self.game.player_meta(player)
+            players.append(
+                {
+                    "player": [
+                        meta[:5]
+                        + [
+                            {
+                                "is_keeper": {
+                                    "status": False,
+                                    "cost": False,
+                                    "kept": False,
+                                }
+                            }
+                        ]
+                        + meta[5:]
+                        + [
+                            {
+                                "eligible_positions": [
+                                    {"position": player["position"]}
+                                ]
+                            }
+                        ],
+                        {
+                            "selected_position": [
+                                {"coverage_type": "week", "week": str(week)},
+                                {"position": player["position"]},
+                            ]
+                        },
+                    ]
+                }
+            )
+        return content(
+            team=[
+                self.team_meta(team),
+                {"roster": {"0": {"players": collection(players)}}},
+            ]
+        )
+
+    def lookup_players(self, params):
+        if "player_keys" in params:
+            players = [
+                self.game.by_id.get(key.split(".p.")[-1])
+                for key in params["player_keys"].split(",")
+            ]
+        elif "search" in params:
+            players = [self.game.by_name.get(params["search"])]
+        else:
+            start = int(params.get("start", 0))
+            count = int(params.get("count", 25))
+            players = self.free_agents[start : start + count]  # noqa: E203
+        return [player for player in players if player]
+
+    def owner(self, player):
+        for team in self.teams:
+            if player in team["roster"]:
+                return team
+        return None
+
+    def players(self, params, subresource):
+        players = []
+        for player in self.lookup_players(params):
+            if subresource == "ownership":
+                team = self.owner(player)
+                ownership = (
+                    {
+                        "ownership_type": "team",
+                        "owner_team_key": team["team_key"],
+                        "owner_team_name": team["name"],
+                    }
+                    if team
+                    else {"ownership_type": "freeagents"}
+                )
+                players.append(
+                    {
+                        "player": [
+                            self.game.player_meta(player),
+                            {"ownership": ownership},
+                        ]
+                    }
+                )
+            else:
+                players.append(
+                    {
+                        "player": [
+                            self.game.player_details(player),
+                            {
+                                "player_points": {
+                                    "coverage_type": "season",
+                                    "total": "{:.2f}".format(
+                                        int(player["player_id"]) % 300
+                                    ),
+                                }
+                            },
+                        ]
+                    }
+                )
+        return content(
+            league=[
+                self.meta(),
+                {"players": collection(players) if players else []},
+            ]
+        )
+
+    def transaction(self, number):
+        rng = random.Random("{}{}".format(self.league_key, number))
+        timestamp = int(
+            self.created + number * self.server.transaction_interval
+        )
+        kind = ["add", "drop", "add/drop", "add", "trade"][number % 5]
+        team, other = rng.sample(self.teams, 2)
+        details = {
+            "transaction_key": "{}.tr.{}".format(self.league_key, number),
+            "transaction_id": str(number),
+            "type": kind,
+            "status": "successful",
+            "timestamp": str(timestamp),
+        }
+
+        def moved(player, data):
+            return {"player": [self.game.player_meta(player), data]}
+
+        added = rng.choice(self.free_agents)
+        dropped = rng.choice(team["roster"])
+        to_team = {
+            "transaction_data": [
+                {
+                    "type": "add",
+                    "source_type": "freeagents",
+                    "destination_type": "team",
+                    "destination_team_key": team["team_key"],
+                    "destination_team_name": team["name"],
+                }
+            ]
+        }
+        from_team = {
+            "transaction_data": {
+                "type": "drop",
+                "source_type": "team",
+                "source_team_key": team["team_key"],
+                "source_team_name": team["name"],
+                "destination_type": "waivers",
+            }
+        }
+        if kind == "add":
+            players = [moved(added, to_team)]
+        elif kind == "drop":
+            players = [moved(dropped, from_team)]
+        elif kind == "add/drop":
+            players = [moved(added, to_team), moved(dropped, from_team)]
+        else:
+            details.update(
+                trader_team_key=team["team_key"],
+                trader_team_name=team["name"],
+                tradee_team_key=other["team_key"],
+                tradee_team_name=other["name"],
+            )
+            players = [
+                moved(
+                    player,
+                    {
+                        "transaction_data": [
+                            {
+                                "type": "trade",
+                                "source_type": "team",
+                                "source_team_key": source["team_key"],
+                                "source_team_name": source["name"],
+                                "destination_type": "team",
+                                "destination_team_key": destination[
+                                    "team_key"
+                                ],
+                                "destination_team_name": destination["name"],
+                            }
+                        ]
+                    },
+                )
+                for player, source, destination in [
+                    (dropped, team, other),
+                    (rng.choice(other["roster"]), other, team),
+                ]
+            ]
+        return {"transaction": [details, {"players": collection(players)}]}
+
+    def transactions(self, params):
+        if params.get("type") == "pending_trade":
+            transactions = []
+        else:
+            types = params.get("types", "add,drop,trade").split(",")
+            count = int(params.get("count") or 25)
+            latest = int(
+                (time.time() - self.created)
+                // self.server.transaction_interval
+            )
+            transactions = []
+            for number in range(latest, 0, -1):
+                if len(transactions) == count:
+                    break
+                transaction = self.transaction(number)
+                kind = transaction["transaction"][0]["type"]
+                if any(part in types for part in kind.split("/")):
+                    transactions.append(transaction)
+        return content(
+            league=[
+                self.meta(),
+                {"transactions": collection(transactions)},
+            ]
+        )
+
+
+class YahooStandIn:
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.5,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        teams=12,
+        week=1,
+        scoring_type="head",
+        score_interval=60,
+        transaction_interval=300,
+        recordings=None,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.teams = teams
+        self.week = week
+        self.scoring_type = scoring_type
+        self.score_interval = score_interval
+        self.transaction_interval = transaction_interval
+        self.recordings = recordings
+        self.random = random.Random(seed)
+        self.started = time.time()
+        self.games = {}
+        self.leagues = {}
+        self.requests = {}
+        self.errors = 0
+        self.throttled = 0
+
+    def game(self, code):
+        if code not in self.games:
+            self.games[code] = Game(code)
+        return self.games[code]
+
+    def league(self, league_key):
+        if league_key not in self.leagues:
+            game_id = league_key.split(".l.")[0]
+            codes = {game_id: code for code, game_id in GAME_IDS.items()}
+            self.leagues[league_key] = League(
+                self, self.game(codes.get(game_id, game_id)), league_key
+            )
+        return self.leagues[league_key]
+
+    def recorded(self, uri):
+        if not self.recordings:
+            return None
+        path = os.path.join(
+            self.recordings, endpoint_path(uri).replace("/", "_") + ".json"
+        )
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def respond(self, uri):
+        """Payload for ``uri``, the part of the url after ``fantasy/v2``."""
+        recorded = self.recorded(uri)
+        if recorded is not None:
+            return recorded
+        segments = [parse_segment(s) for s in uri.strip("/").split("/")]
+        (kind, _), key = segments[0], segments[1][0]
+        resource, params = segments[2] if len(segments) > 2 else (None, {})
+        subresource = segments[3][0] if len(segments) > 3 else None
+        if kind == "game":
+            game = self.game(key)
+            if resource is None:
+                return content(
+                    game=[
+                        {
+                            "game_key": game.game_id,
+                            "game_id": game.game_id,
+                            "code": game.code,
+                            "season": SEASON,
+                        }
+                    ]
+                )
+            if resource == "players":
+                start = int(params.get("start", 0))
+                count = int(params.get("count", 25))
+                page = game.players[start : start + count]  # noqa: E203
+                return content(
+                    game=[
+                        {"game_key": game.game_id, "code": game.code},
+                        {
+                            "players": (
+                                collection(
+                                    [
+                                        {"player": [game.player_details(p)]}
+                                        for p in page
+                                    ]
+                                )
+                                if page
+                                else []
+                            )
+                        },
+                    ]
+                )
+        elif kind == "league":
+            league = self.league(key)
+            if resource == "settings":
+                return league.settings()
+            if resource == "standings":
+                return league.standings()
+            if resource == "teams":
+                return league.teams_payload()
+            if resource == "scoreboard":
+                return league.scoreboard(int(params.get("week", self.week)))
+            if resource == "players":
+                return league.players(params, subresource)
+            if resource == "transactions":
+                return league.transactions(params)
+        elif kind == "team":
+            league = self.league(key.split(".t.")[0])
+            if resource == "roster":
+                return league.roster(key, int(params.get("week", self.week)))
+        raise web.HTTPNotFound(text="unsupported uri {}".format(uri))
+
+    async def handle(self, request):
+        uri = request.match_info["uri"]
+        endpoint = endpoint_path(uri)
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if not request.headers.get("Authorization", "").startswith("Bearer"):
+            raise web.HTTPUnauthorized(text="missing bearer token")
+        if self.latency:
+            await asyncio.sleep(
+                self.latency
+                * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+            )
+        if self.random.random() < self.throttle_rate:
+            # yahoo's throttling response
+            self.throttled += 1
+            return web.Response(status=THROTTLED, text="Request denied")
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=500, text="Internal error")
+        return web.json_response(self.respond(uri))
+
+    async def stats(self, request):
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "errors": self.errors,
+                "throttled": self.throttled,
+            }
+        )
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_get("/fantasy/v2/{uri:.*}", self.handle)
+        return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--week", type=int, default=1)
+    parser.add_argument(
+        "--scoring-type", default="head", choices=["head", "headone"]
+    )
+    parser.add_argument("--score-interval", type=float, default=60)
+    parser.add_argument("--transaction-interval", type=float, default=300)
+    parser.add_argument("--recordings")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    server = YahooStandIn(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        teams=args.teams,
+        week=args.week,
+        scoring_type=args.scoring_type,
+        score_interval=args.score_interval,
+        transaction_interval=args.transaction_interval,
+        recordings=args.recordings,
+        seed=args.seed,
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
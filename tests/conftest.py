@@ -1,8 +1,13 @@
 import os
 import json
 import pytest
+import time
 
 from unittest.mock import MagicMock, patch
+from harambot.cache import guild_cache, league_cache, render_cache
+from harambot.cache import single_flight
+from harambot.database.models import database, Guild, Player
+from harambot.database.models import PollerLease, PollerWorker
 from harambot.yahoo_api import Yahoo
 from yahoo_fantasy_api import game, League, Team
 
@@ -16,6 +21,41 @@ def load_test_data(filename):
     return test_data
 
 
+@pytest.fixture(autouse=True)
+def setup_database():
+    database.create_tables([Guild, Player, PollerLease, PollerWorker])
+    yield
+    database.drop_tables([Guild, Player, PollerLease, PollerWorker])
+    guild_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_league_cache():
+    league_cache.clear()
+    single_flight.clear()
+    render_cache.clear()
+    yield
+    league_cache.clear()
+    single_flight.clear()
+    render_cache.clear()
+
+
+@pytest.fixture
+def guild():
+    return Guild.create(
+        guild_id="1",
+        access_token="old",
+        refresh_token="refresh",
+        expires_in=3600,
+        token_type="bearer",
+        token_time=int(time.time()),
+        league_id="123456",
+        league_type="nfl",
+        RIP_text="RIP",
+        RIP_image_url="",
+    )
+
+
 @pytest.fixture
 def mock_oauth():
     oauth = MagicMock()
@@ -0,0 +1,13 @@
+from benchmarks import suite
+
+
+def test_suite_runs():
+    results = suite.run(number=1, repeat=1)
+    assert "command.standings" in results["benchmarks"]
+    assert all(result["min"] > 0 for result in results["benchmarks"].values())
+
+
+def test_compare():
+    baseline = {"benchmarks": {"a": {"min": 1.0}, "b": {"min": 1.0}}}
+    results = {"benchmarks": {"a": {"min": 1.1}, "b": {"min": 1.5}}}
+    assert suite.compare(results, baseline, 0.2) == ["b"]
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+
+from types import SimpleNamespace
+
+from harambot.cache import guild_cache, league_cache, league_cached_async
+from harambot.cache import render_cache, single_flight
+from harambot.database.models import Guild
+
+
+class FakeYahoo:
+    def __init__(self, guild_id=None):
+        self.guild_id = guild_id
+        self.calls = 0
+        self.fail = False
+
+    async def league_handle_async(self):
+        return SimpleNamespace(league_key="414.l.1", current_week=1)
+
+    @league_cached_async("standings")
+    async def get_standings_async(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("refresh failed")
+        return ["standings"]
+
+    @league_cached_async("latest_trade", per_guild=True)
+    async def get_latest_trade_async(self):
+        self.calls += 1
+        return {"guild": self.guild_id}
+
+
+def test_cached_per_league():
+    api = FakeYahoo()
+    asyncio.run(api.get_standings_async())
+    assert asyncio.run(FakeYahoo().get_standings_async()) == ["standings"]
+    assert api.calls == 1
+    assert league_cache.hits["standings"] == 1
+
+
+def test_cached_per_guild():
+    first, second = FakeYahoo("1"), FakeYahoo("2")
+    assert asyncio.run(first.get_latest_trade_async()) == {"guild": "1"}
+    assert asyncio.run(second.get_latest_trade_async()) == {"guild": "2"}
+    asyncio.run(first.get_latest_trade_async())
+    assert (first.calls, second.calls) == (1, 1)
+
+
+def test_concurrent_calls_coalesced():
+    api = FakeYahoo()
+
+    async def run():
+        return await asyncio.gather(
+            *[api.get_standings_async() for _ in range(5)]
+        )
+
+    assert asyncio.run(run()) == [["standings"]] * 5
+    assert api.calls == 1
+    assert single_flight.coalesced["standings"] == 4
+
+
+def test_stale_while_revalidate(monkeypatch):
+    monkeypatch.setattr("harambot.cache.endpoint_ttl", lambda endpoint: 0)
+    monkeypatch.setattr("harambot.cache.endpoint_grace", lambda e: 60)
+    api = FakeYahoo()
+
+    async def run():
+        await api.get_standings_async()
+        stale = await api.get_standings_async()
+        calls_while_stale = api.calls
+        await asyncio.sleep(0.05)
+        return stale, calls_while_stale
+
+    stale, calls_while_stale = asyncio.run(run())
+    assert stale == ["standings"]
+    assert calls_while_stale == 1
+    assert api.calls == 2
+
+
+def test_failed_background_refresh_logged(monkeypatch, caplog):
+    monkeypatch.setattr("harambot.cache.endpoint_ttl", lambda endpoint: 0)
+    monkeypatch.setattr("harambot.cache.endpoint_grace", lambda e: 60)
+    api = FakeYahoo()
+    errors = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context)
+        )
+        await api.get_standings_async()
+        api.fail = True
+        stale = await api.get_standings_async()
+        await asyncio.sleep(0.05)
+        return stale
+
+    with caplog.at_level(logging.ERROR):
+        assert asyncio.run(run()) == ["standings"]
+    assert "Error while refreshing standings" in caplog.text
+    # the task's exception was retrieved
+    assert errors == []
+
+
+def test_guild_cache(guild):
+    invalidated = []
+    guild_cache.on_invalidate(invalidated.append)
+    try:
+        assert guild_cache.get(1) is guild_cache.get("1")
+        Guild.update(league_id="654321").where(Guild.guild_id == "1").execute()
+        assert guild_cache.get("1").league_id == "123456"
+        guild_cache.invalidate(1)
+        assert guild_cache.get("1").league_id == "654321"
+        assert invalidated == ["1"]
+    finally:
+        guild_cache.listeners.remove(invalidated.append)
+
+
+def test_render_cache_follows_data():
+    renders = []
+
+    def render(data):
+        renders.append(data)
+        return {"rendered": data}
+
+    standings = ["standings"]
+    first = render_cache.get(1, ("standings",), standings, render)
+    assert render_cache.get("1", ("standings",), standings, render) is first
+    assert len(renders) == 1
+    # the league cache refreshed, the data is a new object
+    render_cache.get(1, ("standings",), ["standings"], render)
+    assert len(renders) == 2
+    render_cache.invalidate(1)
+    render_cache.get(1, ("standings",), ["standings"], render)
+    assert len(renders) == 3
+    assert render_cache.hits == 1
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from playhouse.db_url import connect
+from playhouse.pool import PooledPostgresqlDatabase, PooledSqliteDatabase
+
+from playhouse.migrate import migrate
+from unittest.mock import patch
+
+from harambot.config import settings
+from harambot.database import connection
+from harambot.database.connection import pooled_url, run_db
+from harambot.database.migrations import beta040_migrations, migrator
+from harambot.database.models import Guild, database
+
+
+def test_pooled_url():
+    assert (
+        pooled_url("postgres://u:p@host/db") == "postgres+pool://u:p@host/db"
+    )
+    assert pooled_url("sqlite+pool:///bot.db") == "sqlite+pool:///bot.db"
+    assert isinstance(
+        connect(pooled_url("postgresql://u:p@host/db")),
+        PooledPostgresqlDatabase,
+    )
+    assert isinstance(
+        connect(pooled_url("sqlite:///bot.db")), PooledSqliteDatabase
+    )
+
+
+def test_run_db():
+    async def count():
+        return await run_db(Guild.select().count)
+
+    assert asyncio.run(count()) == 0
+
+
+def test_run_db_pooled(tmp_path):
+    settings.set("database_url", "sqlite:///{}".format(tmp_path / "bot.db"))
+    try:
+        pooled = connection.create_database()
+    finally:
+        settings.unset("database_url")
+    threads = []
+
+    def create(guild_id):
+        threads.append(threading.current_thread().name)
+        return Guild.create(
+            guild_id=guild_id,
+            access_token="token",
+            refresh_token="refresh",
+            expires_in=3600,
+            token_type="bearer",
+            token_time=0,
+            league_id="123456",
+            league_type="nfl",
+            RIP_text="RIP",
+            RIP_image_url="",
+        )
+
+    async def run():
+        await asyncio.gather(*[run_db(create, str(i)) for i in range(5)])
+        return await run_db(Guild.select().count)
+
+    with patch.object(connection, "database", pooled), pooled.bind_ctx(
+        [Guild]
+    ):
+        with pooled.connection_context():
+            pooled.create_tables([Guild])
+        assert asyncio.run(run()) == 5
+    assert isinstance(pooled, PooledSqliteDatabase)
+    assert all(name.startswith("database") for name in threads)
+    # every connection went back to the pool
+    assert not pooled._in_use
+    pooled.close_all()
+
+
+def test_beta040_migrations():
+    migrate(
+        migrator.drop_column("guild", "channel_id"),
+        migrator.drop_column("guild", "last_transaction_key"),
+    )
+    beta040_migrations()
+    # running again on an up to date table is a no-op
+    beta040_migrations()
+    columns = {column.name for column in database.get_columns("guild")}
+    assert {"channel_id", "last_transaction_key"} <= columns
@@ -0,0 +1,26 @@
+import asyncio
+
+from harambot.executor import YahooExecutor
+
+
+def test_run():
+    executor = YahooExecutor(max_workers=2)
+    result = asyncio.run(executor.run(lambda x, y=0: x + y, 1, y=2))
+    assert result == 3
+    stats = executor.stats()
+    assert stats["workers"] == 2
+    assert stats["completed"] == 1
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+
+
+def test_run_bounded():
+    executor = YahooExecutor(max_workers=1)
+
+    async def run_many():
+        return await asyncio.gather(
+            *[executor.run(lambda i=i: i) for i in range(5)]
+        )
+
+    assert asyncio.run(run_many()) == [0, 1, 2, 3, 4]
+    assert executor.stats()["completed"] == 5
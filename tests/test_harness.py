@@ -0,0 +1,43 @@
+import asyncio
+
+from aiohttp.test_utils import TestServer
+
+from harambot.config import settings
+from harambot.database.models import Guild
+from loadtest.harness import LoadTest, percentile
+from loadtest.yahoo_server import YahooStandIn
+
+
+def test_load_test_runs():
+    async def run():
+        server = TestServer(YahooStandIn(teams=4).app())
+        await server.start_server()
+        settings.set("yahoo_api_url", str(server.make_url("/fantasy/v2")))
+        try:
+            return await LoadTest(
+                2,
+                duration=1,
+                rate=600,
+                poll_interval=0.5,
+                discord_latency=0,
+                teams=4,
+                seed=1,
+            ).run()
+        finally:
+            settings.unset("yahoo_api_url")
+            await server.close()
+
+    results = asyncio.run(run())
+    assert results["latency"]["count"] > 0
+    assert results["polls"] > 0
+    assert results["yahoo_calls"]["poll"] > 0
+    assert all(
+        stats["failures"] == 0 for stats in results["commands"].values()
+    )
+    assert Guild.select().count() == 0
+
+
+def test_percentile():
+    assert percentile([], 99) == 0.0
+    assert percentile(list(range(1, 101)), 50) == 51
+    assert percentile(list(range(1, 101)), 99) == 100
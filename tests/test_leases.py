@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from unittest.mock import MagicMock
+
+from harambot.cogs.yahoo import YahooCog
+from harambot.database.models import Guild, PollerLease, PollerWorker
+from harambot.leases import PollerLeases
+
+GUILDS = ["1", "2", "3", "4"]
+
+
+def test_shares_guilds_between_workers():
+    a = PollerLeases(worker_id="a", group="all")
+    b = PollerLeases(worker_id="b", group="all")
+    assert a.sync(GUILDS) == (set(GUILDS), set())
+    # b has joined, a stops polling half and then releases it
+    assert b.sync(GUILDS) == (set(), set())
+    assert a.sync(GUILDS) == ({"1", "2"}, {"3", "4"})
+    assert a.holds("1") and not a.holds("3")
+    assert b.sync(GUILDS) == (set(), set())
+    a.release({"3", "4"})
+    assert b.sync(GUILDS) == ({"3", "4"}, set())
+    assert not b.claim("1")
+
+
+def test_expired_leases_are_picked_up():
+    a = PollerLeases(worker_id="a", group="all")
+    b = PollerLeases(worker_id="b", group="all")
+    a.sync(GUILDS)
+    b.sync(GUILDS)
+    a.release(a.sync(GUILDS)[1])
+    b.sync(GUILDS)
+    # a stops renewing
+    PollerWorker.update(expires_at=0).where(
+        PollerWorker.worker_id == "a"
+    ).execute()
+    PollerLease.update(expires_at=0).where(PollerLease.owner == "a").execute()
+    assert b.sync(GUILDS) == (set(GUILDS), set())
+    assert a.sync(GUILDS) == (set(), set())
+
+
+def test_release():
+    a = PollerLeases(worker_id="a", group="all")
+    b = PollerLeases(worker_id="b", group="0/2")
+    a.sync(GUILDS)
+    a.release()
+    assert not a.holds("1")
+    assert PollerWorker.select().count() == 0
+    # workers in other shard groups don't count towards the share
+    assert b.sync(GUILDS) == (set(GUILDS), set())
+    assert b.claim("5")
+    assert b.holds("5")
+
+
+def test_cursor_saved_by_lease_owner_only(guild):
+    cog = YahooCog(MagicMock(), "key", "secret")
+    cog.leases = PollerLeases(worker_id="a", group="all")
+    cog.leases.claim(guild.guild_id)
+    read = Guild.get(Guild.guild_id == guild.guild_id)
+
+    def save(row, key):
+        transaction = {"timestamp": time.time(), "transaction_key": key}
+        return asyncio.run(cog.save_transaction_cursor(row, transaction))
+
+    cog.yahoo_apis[guild.guild_id] = "cached"
+    assert save(read, "1")
+    # moving the cursor leaves the guild's cached objects alone
+    assert cog.yahoo_apis[guild.guild_id] == "cached"
+    # the cursor moved since it was read
+    assert not save(read, "2")
+    read = Guild.get(Guild.guild_id == guild.guild_id)
+    assert read.last_transaction_key == "1"
+    # b took the lease over
+    PollerLease.update(owner="b").execute()
+    assert not save(read, "2")
+    assert Guild.get(Guild.guild_id == "1").last_transaction_key == "1"
+
+
+def test_reconfigured_guild_rebuilds_yahoo(guild):
+    cog = YahooCog(MagicMock(), "key", "secret")
+
+    async def run():
+        cog.tokens.sessions[guild.guild_id] = MagicMock()
+        first = await cog.yahoo_from_guild(guild)
+        # /configure ran on another worker, only the row changed
+        Guild.update(league_id="222").execute()
+        fresh = Guild.get(Guild.guild_id == guild.guild_id)
+        second = await cog.yahoo_from_guild(fresh)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.league_id == "123456"
+    assert second.league_id == "222"
@@ -0,0 +1,102 @@
+import asyncio
+
+import discord
+
+from unittest.mock import MagicMock
+
+from harambot.live_scoreboard import LiveScoreboards
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, embed):
+        self.edits.append(embed)
+
+
+class FailingMessage:
+    def __init__(self, status):
+        self.status = status
+        self.attempts = 0
+
+    async def edit(self, embed):
+        self.attempts += 1
+        raise discord.HTTPException(
+            MagicMock(status=self.status, reason="error"), "error"
+        )
+
+
+def test_edits_only_on_change():
+    scores = iter([("1", ["0-0"]), ("1", ["0-0"]), ("1", ["7-0"])])
+    fetched = []
+
+    async def fetch(guild_id):
+        fetched.append(guild_id)
+        return next(scores, ("1", ["7-0"]))
+
+    async def run():
+        boards = LiveScoreboards(
+            fetch,
+            lambda matchups: matchups[1],
+            interval=0.01,
+            min_edit_interval=0,
+        )
+        first, second = FakeMessage(), FakeMessage()
+        boards.add(("nfl", "1"), 1, first, ("1", ["0-0"]))
+        boards.add(("nfl", "1"), 2, second, ("1", ["0-0"]))
+        await asyncio.sleep(0.08)
+        boards.stop()
+        return boards, first, second
+
+    boards, first, second = asyncio.run(run())
+    assert first.edits == second.edits == [["7-0"]]
+    # one fetch per tick for the whole league
+    assert len(fetched) == boards.fetches
+    assert set(fetched) == {"1"}
+
+
+def test_edit_rate_limited():
+    async def fetch(guild_id):
+        return ("1", [str(asyncio.get_running_loop().time())])
+
+    async def run():
+        boards = LiveScoreboards(
+            fetch,
+            lambda matchups: matchups,
+            interval=0.01,
+            min_edit_interval=60,
+        )
+        message = FakeMessage()
+        boards.add(("nfl", "1"), 1, message, ("1", []))
+        await asyncio.sleep(0.05)
+        boards.remove(1)
+        assert not boards.tasks
+        return message
+
+    assert asyncio.run(run()).edits == []
+
+
+def test_failing_boards_dropped():
+    async def fetch(guild_id):
+        return ("1", [str(asyncio.get_running_loop().time())])
+
+    async def run():
+        boards = LiveScoreboards(
+            fetch,
+            lambda matchups: matchups,
+            interval=0.01,
+            min_edit_interval=0,
+        )
+        boards.max_failures = 3
+        expired, flaky = FailingMessage(401), FailingMessage(500)
+        boards.add(("nfl", "1"), 1, expired, ("1", []))
+        boards.add(("nfl", "2"), 2, flaky, ("1", []))
+        await asyncio.sleep(0.1)
+        assert not boards.leagues
+        assert not boards.tasks
+        return expired, flaky
+
+    expired, flaky = asyncio.run(run())
+    assert expired.attempts == 1
+    assert flaky.attempts == 3
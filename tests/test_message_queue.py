@@ -0,0 +1,67 @@
+import asyncio
+
+from unittest.mock import MagicMock
+
+import discord
+
+from harambot.message_queue import MessageQueue
+
+
+class FakeChannel:
+    def __init__(self, fail_on=None):
+        self.sent = []
+        self.fail_on = fail_on
+
+    async def send(self, embeds):
+        if len(self.sent) == self.fail_on:
+            raise discord.HTTPException(MagicMock(status=500), "error")
+        self.sent.append(embeds)
+
+
+def test_batches_in_order():
+    channel = FakeChannel()
+    queue = MessageQueue(batch_size=10, min_interval=0)
+
+    async def run():
+        await queue.send("channel", channel.send, list(range(23)))
+
+    asyncio.run(run())
+    assert channel.sent == [
+        list(range(10)),
+        list(range(10, 20)),
+        list(range(20, 23)),
+    ]
+    assert queue.stats()["messages"] == 3
+    assert queue.stats()["delivered"] == 23
+    assert queue.stats()["depth"] == 0
+
+
+def test_failure_fails_everything_behind_it():
+    channel = FakeChannel(fail_on=1)
+    queue = MessageQueue(batch_size=2, min_interval=0)
+
+    async def run():
+        return await asyncio.gather(
+            *queue.put("channel", channel.send, list(range(6))),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[:2] == [None, None]
+    assert all(isinstance(r, discord.HTTPException) for r in results[2:])
+    assert channel.sent == [[0, 1]]
+    assert queue.stats()["failed"] == 4
+
+
+def test_retries_rate_limited_send():
+    attempts = []
+
+    async def send(embeds):
+        attempts.append(embeds)
+        if len(attempts) == 1:
+            response = MagicMock(status=429, headers={"Retry-After": "0.01"})
+            raise discord.HTTPException(response, "rate limited")
+
+    queue = MessageQueue(min_interval=0)
+    asyncio.run(queue.send("channel", send, ["embed"]))
+    assert attempts == [["embed"], ["embed"]]
@@ -0,0 +1,37 @@
+from harambot.metrics import Collected, Counter, Histogram, Registry
+from harambot.yahoo_client import endpoint_path
+
+
+def test_histogram_render():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    histogram.observe(0.05, command="standings")
+    histogram.observe(0.5, command="standings")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{command="standings",le="0.1"} 1.0' in lines
+    assert 'latency_seconds_bucket{command="standings",le="1"} 2.0' in lines
+    assert 'latency_seconds_bucket{command="standings",le="+Inf"} 2.0' in lines
+    assert 'latency_seconds_count{command="standings"} 2.0' in lines
+
+
+def test_registry_render():
+    registry = Registry()
+    counter = registry.register(Counter("calls_total", "Calls."))
+    counter.inc(endpoint="league/standings")
+    registry.register(
+        Collected("lag_seconds", "Lag.", lambda: [({"guild": "1"}, 0.5)])
+    )
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{endpoint="league/standings"} 1.0' in text
+    assert 'lag_seconds{guild="1"} 0.5' in text
+
+
+def test_endpoint_path():
+    assert endpoint_path("league/414.l.1/scoreboard") == "league/scoreboard"
+    assert (
+        endpoint_path("league/414.l.1/players;player_keys=414.p.1/ownership")
+        == "league/players/ownership"
+    )
+    assert endpoint_path("game/nfl/players;start=0;count=25") == (
+        "game/nfl/players"
+    )
@@ -0,0 +1,64 @@
+from harambot.players import get_players, players_from_page, save_players
+
+
+def test_players_from_page():
+    page = {
+        "fantasy_content": {
+            "game": [
+                {"game_key": "414"},
+                {
+                    "players": {
+                        "0": {
+                            "player": [
+                                [
+                                    {"player_key": "414.p.30977"},
+                                    {"player_id": "30977"},
+                                    {"name": {"full": "Josh Allen"}},
+                                    [],
+                                    {"editorial_team_abbr": "Buf"},
+                                ]
+                            ]
+                        },
+                        "count": 1,
+                    }
+                },
+            ]
+        }
+    }
+    players = players_from_page(page)
+    assert players == [
+        {
+            "player_key": "414.p.30977",
+            "player_id": "30977",
+            "name": {"full": "Josh Allen"},
+            "editorial_team_abbr": "Buf",
+        }
+    ]
+
+
+def test_save_players(mock_player_details):
+    save_players("nfl", mock_player_details)
+    save_players("nfl", mock_player_details)
+    players = get_players("nfl", [30977, "1"])
+    assert list(players) == ["30977"]
+    assert players["30977"].name == "Josh Allen"
+    assert players["30977"].team_abbr == "Buf"
+    assert get_players("nba", ["30977"]) == {}
+
+
+def test_headshots_read_from_store(api, mock_player_details):
+    save_players("nfl", mock_player_details)
+    headshots = api.get_player_headshots(["30977"])
+    assert headshots["30977"] == mock_player_details[0]["headshot"]["url"]
+    api.league().player_details.assert_not_called()
+
+
+def test_player_details_read_from_store(api, mock_player_details):
+    save_players("nfl", mock_player_details)
+    player = api.get_player_details("josh allen")
+    assert player["player_key"] == "399.p.30977"
+    assert player["editorial_team_abbr"] == "Buf"
+    assert player["owner"] == "Hide and Go Zeke"
+    api.league().player_details.assert_not_called()
+    api.get_player_details("Josh Allen", stats=True)
+    api.league().player_details.assert_called_once_with("Josh Allen")
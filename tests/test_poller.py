@@ -0,0 +1,105 @@
+import asyncio
+
+from harambot.poller import TransactionPoller
+
+
+def test_polls_every_guild():
+    polled = []
+
+    async def poll_guild(guild_id, channel_id):
+        polled.append((guild_id, channel_id))
+
+    async def run():
+        poller = TransactionPoller(poll_guild, interval=0.05, concurrency=2)
+        poller.add_guild(1, 10)
+        poller.add_guild(2, 20)
+        poller.add_guild(3, 30)
+        await asyncio.sleep(0.12)
+        poller.stop()
+
+    asyncio.run(run())
+    assert {("1", 10), ("2", 20), ("3", 30)} <= set(polled)
+
+
+def test_concurrency_cap():
+    running = []
+    peak = []
+
+    async def poll_guild(guild_id, channel_id):
+        running.append(guild_id)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(guild_id)
+
+    async def run():
+        poller = TransactionPoller(poll_guild, interval=0.01, concurrency=2)
+        for guild_id in range(6):
+            poller.add_guild(guild_id, guild_id)
+        await asyncio.sleep(0.1)
+        poller.stop()
+
+    asyncio.run(run())
+    assert max(peak) == 2
+
+
+def test_remove_guild():
+    async def poll_guild(guild_id, channel_id):
+        pass
+
+    async def run():
+        poller = TransactionPoller(poll_guild, interval=60)
+        poller.add_guild("1", "10")
+        assert poller.is_polling(1)
+        poller.remove_guild(1)
+        assert not poller.is_polling(1)
+
+    asyncio.run(run())
+
+
+def test_stop_guild_waits_for_poll():
+    events = []
+
+    async def poll_guild(guild_id, channel_id):
+        events.append("started")
+        try:
+            await asyncio.sleep(60)
+        finally:
+            events.append("cancelled")
+
+    async def run():
+        poller = TransactionPoller(poll_guild, interval=60)
+        poller.offset = lambda guild_id: 0
+        poller.add_guild("1", "10")
+        await asyncio.sleep(0.01)
+        await poller.stop_guild("1")
+        # nothing is polling the guild any more once it returns
+        assert events == ["started", "cancelled"]
+        assert not poller.is_polling("1")
+
+    asyncio.run(run())
+
+
+def test_paused_shard():
+    polled = []
+
+    async def poll_guild(guild_id, channel_id):
+        polled.append(guild_id)
+
+    async def run():
+        poller = TransactionPoller(
+            poll_guild,
+            interval=0.02,
+            shard_of=lambda guild_id: int(guild_id) % 2,
+        )
+        poller.pause_shard(1)
+        for guild_id in range(4):
+            poller.add_guild(guild_id, guild_id)
+        assert poller.shard_guilds() == {0: 2, 1: 2}
+        await asyncio.sleep(0.05)
+        assert set(polled) == {"0", "2"}
+        poller.resume_shard(1)
+        await asyncio.sleep(0.05)
+        poller.stop()
+
+    asyncio.run(run())
+    assert set(polled) == {"0", "1", "2", "3"}
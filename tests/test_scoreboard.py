@@ -0,0 +1,24 @@
+from harambot.scoreboard import parse_scoreboard
+
+
+def test_parse_scoreboard_head(mock_matchups):
+    week, matchups = parse_scoreboard(mock_matchups)
+    assert week == 12
+    assert len(matchups) == 6
+    team = matchups[0].teams[0]
+    assert len(matchups[0].teams) == 2
+    assert team.points == "0.00"
+    assert team.projected_points == "107.77"
+    assert team.win_probability == 0.24
+    assert team.remaining_games is None
+
+
+def test_parse_scoreboard_category(mock_matchups_category):
+    week, matchups = parse_scoreboard(mock_matchups_category)
+    assert week == 9
+    assert len(matchups) == 7
+    team = matchups[0].teams[0]
+    assert team.team_key.startswith("418.l.15944.t.")
+    assert team.points == "4"
+    assert team.projected_points is None
+    assert team.completed_games == 13
@@ -0,0 +1,40 @@
+import pytest
+
+from unittest.mock import MagicMock
+
+from harambot.config import settings
+from harambot.sharding import guild_shard, owns_guild, shard_id
+from harambot.sharding import shard_options
+
+# discord ids carry their creation time above bit 22
+GUILD_ID = 3 << 22
+
+
+def test_shard_id():
+    assert shard_id(GUILD_ID, 2) == 1
+    assert shard_id(str(GUILD_ID), 4) == 3
+    assert shard_id(GUILD_ID, None) == 0
+
+
+def test_owns_guild():
+    bot = MagicMock(shard_count=4, shard_ids=[0, 3])
+    assert guild_shard(bot, GUILD_ID) == 3
+    assert owns_guild(bot, GUILD_ID)
+    assert not owns_guild(bot, 1 << 22)
+    # every shard when shard_ids isn't set, or before connecting
+    assert owns_guild(MagicMock(shard_count=4, shard_ids=None), 1 << 22)
+    assert owns_guild(MagicMock(), GUILD_ID)
+
+
+def test_shard_options():
+    assert shard_options() == {"shard_count": None, "shard_ids": None}
+    settings.set("shard_count", 4)
+    settings.set("shard_ids", [2, 3])
+    try:
+        assert shard_options() == {"shard_count": 4, "shard_ids": [2, 3]}
+        settings.set("shard_count", 0)
+        with pytest.raises(ValueError):
+            shard_options()
+    finally:
+        settings.set("shard_count", 0)
+        settings.set("shard_ids", [])
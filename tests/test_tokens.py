@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from unittest.mock import MagicMock, patch
+
+from harambot.database.models import Guild
+from harambot.tokens import TokenManager
+from harambot.yahoo_api import LeagueHandle, Yahoo
+
+
+def create_guild(token_time):
+    return Guild.create(
+        guild_id="1",
+        access_token="old",
+        refresh_token="refresh",
+        expires_in=3600,
+        token_type="bearer",
+        token_time=token_time,
+        league_id="123456",
+        league_type="nfl",
+        RIP_text="RIP",
+        RIP_image_url="",
+    )
+
+
+def mock_session(guild):
+    oauth = MagicMock()
+    oauth.token_time = guild.token_time
+    oauth.token_is_valid.return_value = True
+
+    def refresh_access_token():
+        time.sleep(0.01)
+        oauth.access_token = "new"
+        oauth.token_time = time.time()
+
+    oauth.refresh_access_token.side_effect = refresh_access_token
+    return oauth
+
+
+def test_session_reused():
+    guild = create_guild(int(time.time()))
+    tokens = TokenManager("key", "secret")
+    tokens.create_session = MagicMock(side_effect=mock_session)
+
+    async def run():
+        return await asyncio.gather(tokens.get(guild), tokens.get(guild))
+
+    first, second = asyncio.run(run())
+    assert first is second
+    tokens.create_session.assert_called_once()
+    assert tokens.refresh_count == 0
+
+
+def test_refresh_expiring_saves_token():
+    guild = create_guild(int(time.time()) - 3500)
+    tokens = TokenManager("key", "secret")
+    tokens.create_session = MagicMock(side_effect=mock_session)
+
+    async def run():
+        oauth = await tokens.get(guild)
+        await asyncio.gather(
+            tokens.refresh_expiring(), tokens.refresh(guild.guild_id)
+        )
+        return oauth
+
+    oauth = asyncio.run(run())
+    oauth.refresh_access_token.assert_called_once()
+    assert tokens.refresh_count == 1
+    assert Guild.get(Guild.guild_id == "1").access_token == "new"
+
+
+def test_yahoo_refreshes_through_manager():
+    guild = create_guild(int(time.time()))
+    tokens = TokenManager("key", "secret")
+    tokens.create_session = MagicMock(side_effect=mock_session)
+
+    async def run():
+        oauth = await tokens.get(guild)
+        oauth.token_is_valid.return_value = False
+        api = Yahoo(oauth, "123456", "nfl", guild.guild_id, tokens)
+        await asyncio.gather(api.check_token_async(), tokens.refresh("1"))
+        # the sync api runs on an executor thread
+        with patch.object(LeagueHandle, "is_stale", return_value=False):
+            await asyncio.to_thread(api.league)
+        return oauth
+
+    oauth = asyncio.run(run())
+    assert oauth.refresh_access_token.call_count == 2
+    assert tokens.refresh_count == 2
+    assert Guild.get(Guild.guild_id == "1").access_token == "new"
@@ -0,0 +1,41 @@
+import asyncio
+
+from harambot.executor import yahoo_executor
+from harambot.tracing import traced, tracer
+
+
+@traced("inner")
+def inner():
+    return "inner"
+
+
+@traced("outer")
+async def outer():
+    await asyncio.gather(yahoo_executor.run(inner), yahoo_executor.run(inner))
+    return "outer"
+
+
+def test_nested_spans(monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    tracer.traces.clear()
+    assert asyncio.run(outer()) == "outer"
+    trace = tracer.recent()[-1]
+    assert trace["name"] == "outer"
+    assert [child["name"] for child in trace["children"]] == ["inner"] * 2
+    assert trace["duration"] >= trace["children"][0]["duration"]
+
+
+def test_not_sampled(monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    tracer.traces.clear()
+    asyncio.run(outer())
+    assert tracer.recent() == []
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", False)
+    tracer.traces.clear()
+    assert inner() == "inner"
+    assert tracer.recent() == []
@@ -1,5 +1,7 @@
-from unittest.mock import patch
-from yahoo_fantasy_api import team
+from unittest.mock import MagicMock, patch
+from yahoo_fantasy_api import game, team, League
+from harambot.cache import league_cache
+from harambot.yahoo_api import Yahoo, transaction_position
 
 
 def test_league(api):
@@ -34,14 +36,82 @@ def test_get_player_details(api):
     assert return_value["owner"] == "Hide and Go Zeke"
 
 
+def test_player_details_owner_not_cached_with_details(api):
+    assert api.get_player_details("Josh Allen")["owner"] == "Hide and Go Zeke"
+    # the owner entry expires long before the details do
+    league_cache.invalidate(api.league().league_id, "player_owner")
+    api.league().ownership.return_value = {
+        "30977": {"ownership_type": "freeagents"}
+    }
+    assert api.get_player_details("Josh Allen")["owner"] == "Free Agent"
+    api.league().player_details.assert_called_once()
+
+
 def test_get_matchups(api):
     week, details = api.get_matchups()
     assert isinstance(details, list)
-    assert week == "1"
+    assert week == "12"
 
 
 def test_get_matchups_category(category_api):
     week, details = category_api.get_matchups()
     assert isinstance(details, list)
     assert len(details) == 7
-    assert week == "1"
+    assert week == "9"
+
+
+def test_league_handle_reused(mock_oauth):
+    settings = {"scoring_type": "head", "season": "2022", "current_week": 3}
+    with patch.object(
+        game.Game, "game_id", return_value="414"
+    ) as game_id, patch.object(
+        League, "settings", return_value=settings
+    ) as league_settings:
+        api = Yahoo(mock_oauth, "654321", "nfl")
+        league = api.league()
+        other_oauth = MagicMock()
+        other = Yahoo(other_oauth, "654321", "nfl").league()
+        # each guild gets its own League bound to its own session
+        assert other is not league
+        assert league.sc is mock_oauth and other.sc is other_oauth
+        assert other.league_id == league.league_id == "414.l.654321"
+        assert league.current_week() == 3
+        assert api.scoring_type == "head"
+        game_id.assert_called_once()
+        league_settings.assert_called_once()
+
+
+def test_standings_cached_across_instances(api, mock_oauth):
+    api.get_standings()
+    other = Yahoo(mock_oauth, "123456", "nfl")
+    other.league = api.league
+    assert other.get_standings() == api.get_standings()
+    api.league().standings.assert_called_once()
+
+
+def test_transactions_since(api):
+    transactions = [
+        {"transaction_key": "399.l.1.tr.12", "timestamp": "200"},
+        {"transaction_key": "399.l.1.tr.11", "timestamp": "200"},
+        {"transaction_key": "399.l.1.tr.10", "timestamp": "100"},
+    ]
+    cursor = transaction_position(transactions[1])
+    assert api.transactions_since(transactions, cursor) == [transactions[0]]
+    assert [
+        t["transaction_key"]
+        for t in api.transactions_since(transactions, (0, 0))
+    ] == ["399.l.1.tr.10", "399.l.1.tr.11", "399.l.1.tr.12"]
+
+
+def test_get_player_owners(api):
+    owners = api.get_player_owners(["30977", 30977])
+    assert owners == {"30977": "Hide and Go Zeke"}
+    assert api.get_player_owner("30977") == "Hide and Go Zeke"
+    api.league().ownership.assert_called_once_with(["30977"])
+
+
+def test_get_player_headshots(api):
+    headshots = api.get_player_headshots([30977, "30977"])
+    assert list(headshots) == ["30977"]
+    assert api.get_player_headshots(["30977"]) == headshots
+    api.league().player_details.assert_called_once_with([30977])
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from unittest.mock import patch
+from yahoo_fantasy_api import League
+
+from harambot.yahoo_api import Yahoo, get_league_handle
+from harambot.yahoo_client import AsyncYahooClient, Unauthorized
+
+
+def test_call_fetches_missing_uris(mock_oauth):
+    client = AsyncYahooClient()
+    responses = {
+        "game/nfl": {"game_id": "414"},
+        "league/414.l.1/settings": {"scoring_type": "head"},
+    }
+    fetched = []
+
+    async def get(oauth, uri):
+        fetched.append(uri)
+        return responses[uri]
+
+    def func(handler):
+        game = handler.get_game_raw("nfl")
+        settings = handler.get_settings_raw("{}.l.1".format(game["game_id"]))
+        return settings["scoring_type"]
+
+    client.get = get
+    assert asyncio.run(client.call(mock_oauth, func)) == "head"
+    assert fetched == ["game/nfl", "league/414.l.1/settings"]
+
+
+def test_call_all_fetches_concurrently(mock_oauth):
+    client = AsyncYahooClient()
+    in_flight = []
+    fetched = []
+
+    async def get(oauth, uri):
+        in_flight.append(uri)
+        await asyncio.sleep(0)
+        fetched.append(len(in_flight))
+        return {"uri": uri}
+
+    client.get = get
+    results = asyncio.run(
+        client.call_all(
+            mock_oauth,
+            [
+                lambda handler: handler.get("league/1/standings")["uri"],
+                lambda handler: handler.get("league/1/scoreboard")["uri"],
+            ],
+        )
+    )
+    assert results == ["league/1/standings", "league/1/scoreboard"]
+    # both requests were sent before either came back
+    assert fetched == [2, 2]
+
+
+def test_call_refreshes_once_when_unauthorized(mock_oauth):
+    client = AsyncYahooClient()
+    refreshed = []
+
+    async def get(oauth, uri):
+        if not refreshed:
+            raise Unauthorized("token expired")
+        return {"ok": True}
+
+    async def refresh():
+        refreshed.append(True)
+        return mock_oauth
+
+    client.get = get
+    result = asyncio.run(
+        client.call(
+            mock_oauth, lambda handler: handler.get("game/nfl"), refresh
+        )
+    )
+    assert result == {"ok": True}
+    assert refreshed == [True]
+
+
+def test_call_gives_up_after_refresh(mock_oauth):
+    client = AsyncYahooClient()
+    refreshed = []
+
+    async def get(oauth, uri):
+        raise Unauthorized("token revoked")
+
+    async def refresh():
+        refreshed.append(True)
+        return mock_oauth
+
+    client.get = get
+    with pytest.raises(Unauthorized):
+        asyncio.run(
+            client.call(
+                mock_oauth, lambda handler: handler.get("game/nfl"), refresh
+            )
+        )
+    assert refreshed == [True]
+
+
+def test_get_standings_async(mock_oauth, mock_standings):
+    handle = get_league_handle("nfl", "24680")
+    handle.league_key = "414.l.24680"
+    handle.scoring_type = "head"
+    handle.current_week = 1
+    handle.settings = {"scoring_type": "head"}
+    handle.checked_at = float("inf")
+    api = Yahoo(mock_oauth, "24680", "nfl")
+    with patch.object(League, "standings", return_value=mock_standings):
+        standings = asyncio.run(api.get_standings_async())
+    assert len(standings) == 3
+    assert standings[0]["place"] == "1. Hide and Go Zeke"
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from aiohttp.test_utils import TestServer
+from unittest.mock import MagicMock
+from yahoo_fantasy_api import game
+
+from harambot.config import settings
+from harambot.scoreboard import parse_scoreboard
+from harambot.yahoo_client import AsyncYahooClient
+from loadtest.yahoo_server import YahooStandIn
+
+
+def run_against(standin, func):
+    async def run():
+        server = TestServer(standin.app())
+        await server.start_server()
+        settings.set("yahoo_api_url", str(server.make_url("/fantasy/v2")))
+        client = AsyncYahooClient()
+        try:
+            return await client.call(MagicMock(access_token="token"), func)
+        finally:
+            settings.unset("yahoo_api_url")
+            await client.close()
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def league(handler):
+    gm = game.Game(None, "nfl")
+    gm.inject_yhandler(handler)
+    lg = gm.to_league("{}.l.1234".format(gm.game_id()))
+    lg.inject_yhandler(handler)
+    return lg
+
+
+def test_serves_yahoo_payloads():
+    standin = YahooStandIn(teams=10)
+
+    def fetch(handler):
+        lg = league(handler)
+        return lg.standings(), lg.matchups(), lg.transactions("add,drop", 5)
+
+    standings, matchups, transactions = run_against(standin, fetch)
+    assert len(standings) == 10
+    assert standings[0]["name"] == "Team 1234 1"
+    week, matchups = parse_scoreboard(matchups)
+    assert week == 1
+    assert len(matchups) == 5
+    assert len(transactions) == 5
+    assert standin.requests["league/standings"] == 1
+
+
+def test_throttled():
+    standin = YahooStandIn(throttle_rate=1.0)
+    settings.set("yahoo_client_backoff", 0)
+    try:
+        with pytest.raises(RuntimeError):
+            run_against(standin, lambda handler: league(handler).standings())
+    finally:
+        settings.unset("yahoo_client_backoff")
+    # first attempt plus the retries
+    assert standin.throttled == 4